@@ -0,0 +1,138 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:     # Windows: threads are still serialized, separate processes are not
+    fcntl = None
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - CONTENT-ADDRESSED ARTIFACT STORE
+# =============================================================================
+#
+# ROLE: Separate "computing" (build) from "publishing" (apply).
+#
+# LAYOUT:
+#   <root>/objects/<sha256>.json   - immutable payloads (collection, environment, api)
+#   <root>/specs/<slug>.json       - build manifest: which object each spec produced
+#   <root>/published.json          - what apply last uploaded, per workspace + spec
+#   <root>/published.json.lock     - serializes concurrent apply processes
+#
+# Because objects are addressed by the hash of their content, "did anything
+# change?" is a string comparison, and the last published collection is still
+# on disk as the merge base for the next sync.
+# =============================================================================
+
+DEFAULT_ROOT = ".postman_build"
+
+# flock serializes processes (and is missing on Windows); this serializes the
+# threads of one process, e.g. the workspace fan-out.
+_PUBLISHED_LOCK = threading.Lock()
+
+
+def canonical_bytes(payload):
+    """Deterministic serialization: same content -> same bytes -> same hash."""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def content_hash(payload):
+    return hashlib.sha256(canonical_bytes(payload)).hexdigest()
+
+
+def _tmp_path(path):
+    # Unique per process and thread, so concurrent writers never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class ArtifactStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.specs_dir = os.path.join(root, 'specs')
+        self.published_file = os.path.join(root, 'published.json')
+
+    # --- objects -------------------------------------------------------------
+
+    def put(self, payload):
+        """Store a payload (no-op if already present). Returns its hash."""
+        data = canonical_bytes(payload)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.objects_dir, exist_ok=True)
+            tmp = _tmp_path(path)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)     # atomic: parallel builds never see half a file
+        return digest
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.json")
+
+    def has(self, digest):
+        return bool(digest) and os.path.exists(self.object_path(digest))
+
+    def load(self, digest):
+        with open(self.object_path(digest), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # --- manifests -----------------------------------------------------------
+
+    def write_manifest(self, slug, manifest):
+        os.makedirs(self.specs_dir, exist_ok=True)
+        with open(os.path.join(self.specs_dir, f"{slug}.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def manifest(self, slug):
+        path = os.path.join(self.specs_dir, f"{slug}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def manifests(self):
+        if not os.path.isdir(self.specs_dir):
+            return []
+        result = []
+        for name in sorted(os.listdir(self.specs_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.specs_dir, name), 'r', encoding='utf-8') as f:
+                    result.append(json.load(f))
+        return result
+
+    # --- publish record ------------------------------------------------------
+
+    def load_published(self):
+        if not os.path.exists(self.published_file):
+            return {}
+        with open(self.published_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_published(self, published):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = _tmp_path(self.published_file)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(published, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.published_file)
+
+    @contextlib.contextmanager
+    def _published_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with _PUBLISHED_LOCK, open(f"{self.published_file}.lock", 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def update_published(self, workspace_id, slug, record):
+        """Replace one spec's record. Re-reads under a lock, so parallel workers don't clobber each other."""
+        with self._published_lock():
+            published = self.load_published()
+            published.setdefault(workspace_id, {})[slug] = record
+            self.save_published(published)
@@ -0,0 +1,209 @@
+import os
+import re
+import sys
+import json
+import argparse
+import posixpath
+import subprocess
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - GIT CHANGE DETECTION
+# =============================================================================
+#
+# ROLE: Answer "which specs does this merge actually affect?" so CI re-ingests
+#       only those instead of every spec in the repo.
+#
+# HOW:
+#   1. `git diff --name-only BASE HEAD` lists the changed files.
+#   2. A dependency graph (file -> files it $refs) is kept in
+#      .postman_depgraph.json, keyed by git blob hash. Only blobs that changed
+#      since the last run are read and scanned, so refreshing the graph after a
+#      one-file PR reads one file, not the whole tree.
+#   3. Walk the graph in reverse from each changed file: every spec that
+#      reaches it through $refs (directly or via other shared files) is
+#      affected.
+#
+#   python change_detection.py origin/main HEAD            # print affected specs
+#   python change_detection.py origin/main HEAD --ingest   # ...and run them
+#   python change_detection.py origin/main HEAD --enqueue  # ...or queue them
+#
+# $refs are found with a text scan rather than a YAML parse: it is an order of
+# magnitude faster on large specs and only needs the file part of each ref.
+# YAML specs are recognised by a top-level `openapi:` / `swagger:` line; JSON
+# files are parsed instead, since minified JSON puts the whole spec on one line.
+# =============================================================================
+
+GRAPH_FILE = ".postman_depgraph.json"
+GRAPH_VERSION = 2
+SPEC_EXTENSIONS = ('.yaml', '.yml', '.json')
+
+# "$ref": "common.yaml#/Foo", $ref: './schemas/pet.json', $ref: x.yaml  (local '#/...' refs never match)
+REF_PATTERN = re.compile(r'''["']?\$ref["']?\s*:\s*["']?([^"'#\s,}]+)''')
+SPEC_PATTERN = re.compile(r'''^\s*["']?(?:openapi|swagger)["']?\s*:''', re.MULTILINE)
+
+
+class ChangeDetectionError(Exception):
+    pass
+
+
+def git(*args, cwd=None, stdin=None):
+    try:
+        result = subprocess.run(('git',) + args, cwd=cwd, input=stdin, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise ChangeDetectionError(f"git {' '.join(args)}: {e.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+def is_spec(path, text):
+    if path.endswith('.json'):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return bool(SPEC_PATTERN.search(text))
+        return isinstance(data, dict) and ('openapi' in data or 'swagger' in data)
+    return bool(SPEC_PATTERN.search(text))
+
+
+def scan_refs(path, text):
+    """Return (is_spec, sorted repo-relative paths this file $refs)."""
+    base_dir = posixpath.dirname(path)
+    refs = set()
+    for target in REF_PATTERN.findall(text):
+        if '://' in target:
+            continue              # remote refs are not in this repo
+        refs.add(posixpath.normpath(posixpath.join(base_dir, target)))
+    return is_spec(path, text), sorted(refs)
+
+
+def tree_blobs(revision, cwd=None):
+    """{path: blob_sha} for every spec-like file in `revision`."""
+    blobs = {}
+    for entry in git('ls-tree', '-r', '-z', revision, cwd=cwd).split(b'\0'):
+        if not entry:
+            continue
+        meta, path = entry.split(b'\t', 1)
+        _, kind, sha = meta.split()
+        path = path.decode('utf-8')
+        if kind == b'blob' and path.endswith(SPEC_EXTENSIONS):
+            blobs[path] = sha.decode('ascii')
+    return blobs
+
+
+def read_blobs(shas, cwd=None):
+    """Read many blobs through one `git cat-file --batch` process."""
+    if not shas:
+        return {}
+    output = git('cat-file', '--batch', cwd=cwd, stdin=('\n'.join(shas) + '\n').encode('ascii'))
+    contents = {}
+    offset = 0
+    for sha in shas:
+        header_end = output.index(b'\n', offset)
+        _, _, size = output[offset:header_end].split()
+        start = header_end + 1
+        contents[sha] = output[start:start + int(size)].decode('utf-8', 'replace')
+        offset = start + int(size) + 1          # content is followed by a newline
+    return contents
+
+
+class DependencyGraph:
+    """file -> {blob, spec, refs}, persisted between runs and refreshed per blob."""
+
+    def __init__(self, path=GRAPH_FILE):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == GRAPH_VERSION:
+                self.files = data['files']
+
+    def refresh(self, revision, cwd=None):
+        """Bring the graph up to `revision`. Returns the number of files (re)scanned."""
+        blobs = tree_blobs(revision, cwd)
+        stale = {path: sha for path, sha in blobs.items() if self.files.get(path, {}).get('blob') != sha}
+        contents = read_blobs(sorted(set(stale.values())), cwd)
+        for path, sha in stale.items():
+            is_spec, refs = scan_refs(path, contents[sha])
+            self.files[path] = {"blob": sha, "spec": is_spec, "refs": refs}
+        for path in set(self.files) - set(blobs):
+            del self.files[path]
+        return len(stale)
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": GRAPH_VERSION, "files": self.files}, f, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def dependents(self):
+        reverse = {}
+        for path, entry in self.files.items():
+            for ref in entry['refs']:
+                reverse.setdefault(ref, []).append(path)
+        return reverse
+
+    def affected_specs(self, changed_files):
+        """Specs that are, or transitively $ref, any of the changed files."""
+        reverse = self.dependents()
+        seen = set()
+        pending = list(changed_files)
+        while pending:
+            path = pending.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            pending.extend(reverse.get(path, ()))
+        return sorted(path for path in seen if self.files.get(path, {}).get('spec'))
+
+
+def changed_files(base, head, cwd=None):
+    # --no-renames: a moved shared file must trigger both its old and new dependents
+    output = git('diff', '--name-only', '--no-renames', '-z', base, head, cwd=cwd)
+    return [path.decode('utf-8') for path in output.split(b'\0') if path]
+
+
+def detect(base, head='HEAD', graph_file=None, cwd=None):
+    """Returns (affected specs, changed files, files scanned, repo root). Paths are repo-relative."""
+    root = git('rev-parse', '--show-toplevel', cwd=cwd).decode('utf-8').strip()
+    graph = DependencyGraph(graph_file or os.path.join(root, GRAPH_FILE))
+    scanned = graph.refresh(head, root)
+    graph.save()
+    changed = changed_files(base, head, root)
+    return graph.affected_specs(changed), changed, scanned, root
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the specs affected by the changes between two git revisions")
+    parser.add_argument('base', help="base revision, e.g. origin/main or the merge base")
+    parser.add_argument('head', nargs='?', default='HEAD', help="head revision (default: HEAD)")
+    parser.add_argument('--graph', default=None, help=f"dependency graph cache (default: <repo>/{GRAPH_FILE})")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--ingest', action='store_true', help="run ingest_api.py on the affected specs")
+    action.add_argument('--enqueue', action='store_true', help="add the affected specs to the work queue")
+    args = parser.parse_args(argv)
+
+    try:
+        specs, changed, scanned, root = detect(args.base, args.head, args.graph)
+    except ChangeDetectionError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    # Status goes to stderr so stdout stays a clean list for `xargs`
+    print(f"🔎 {len(changed)} changed file(s) between {args.base} and {args.head}; "
+          f"dependency graph refreshed ({scanned} file(s) scanned); {len(specs)} spec(s) affected",
+          file=sys.stderr)
+    spec_paths = [os.path.relpath(os.path.join(root, spec)) for spec in specs]
+    for path in spec_paths:
+        print(path)
+
+    if not spec_paths or not (args.ingest or args.enqueue):
+        return 0
+    if args.ingest:
+        import ingest_api
+        return ingest_api.main(['run'] + spec_paths)
+    import work_queue
+    return work_queue.main(['enqueue'] + spec_paths)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
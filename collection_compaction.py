@@ -0,0 +1,330 @@
+import sys
+import json
+import copy
+import argparse
+
+from artifact_store import canonical_bytes
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - COLLECTION COMPACTION
+# =============================================================================
+#
+# ROLE: Shrink generated collections before upload without changing what any
+#       request sends.
+#
+# WHY: Generated collections repeat themselves: the same `Accept` header on
+#      every request, the same auth on every request, and a full copy of the
+#      request (`originalRequest`) inside every saved example. Every byte is
+#      paid on each PUT and each time one of our users opens the collection.
+#
+# PASSES (each one is optional, see DEFAULT_POLICY):
+#   auth     - auth shared by every child moves up to the folder; auth equal to
+#              what a request would inherit anyway is removed (Postman
+#              inheritance does the rest).
+#   headers  - OFF by default. Collection v2.1 has no header inheritance, so
+#              headers shared by every request in a folder move into one
+#              folder-level pre-request script that adds them unless the
+#              request sets the same header itself. The headers disappear from
+#              the request tab, code snippets and docs, requests added by hand
+#              to the folder get them too, and generated collections barely
+#              shrink (the same header is a few dozen bytes per request).
+#   examples - `originalRequest` keeps only what differs from the request,
+#              identical examples are dropped, and oversized / surplus
+#              examples are dropped whole (never truncated, so mock servers
+#              never serve broken JSON).
+#   prune    - empty `cookie` / `header` / `description` / `event` /
+#              `variable` fields are removed.
+#   minify   - the artifact is stored and uploaded without whitespace.
+#
+# Request bodies, URLs, scripts and variables are never touched.
+# =============================================================================
+
+HEADER_SCRIPT_MARKER = "// Shared headers hoisted by collection_compaction.py"
+
+DEFAULT_POLICY = {
+    "hoist_auth": True,
+    "hoist_headers": False,             # see the header above: changes what the UI shows
+    "min_requests_to_hoist": 2,
+    "example_request": "minimal",       # full | minimal (only fields that differ) | none
+    "dedupe_examples": True,
+    "max_examples_per_request": None,   # None = keep all
+    "max_example_body_bytes": None,     # None = no limit; larger examples are dropped
+    "prune_empty": True,
+}
+EXAMPLE_REQUEST_MODES = ('full', 'minimal', 'none')
+PRUNABLE_EMPTY = ('cookie', 'header', 'description', 'event', 'variable')
+
+
+class CompactionReport:
+    def __init__(self):
+        self.bytes_before = 0
+        self.bytes_structured = 0
+        self.bytes_after = 0
+        self.headers_hoisted = 0
+        self.auth_hoisted = 0
+        self.auth_removed = 0
+        self.examples_trimmed = 0
+        self.examples_dropped = 0
+        self.fields_pruned = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_before - self.bytes_after
+
+    def summary(self):
+        percent = 100.0 * self.bytes_saved / self.bytes_before if self.bytes_before else 0.0
+        return (f"{self.bytes_before / 1024:.1f} KB -> {self.bytes_after / 1024:.1f} KB "
+                f"(-{percent:.0f}%: structure -{(self.bytes_before - self.bytes_structured) / 1024:.1f} KB, "
+                f"minify -{(self.bytes_structured - self.bytes_after) / 1024:.1f} KB); "
+                f"{self.headers_hoisted} headers hoisted, {self.auth_hoisted + self.auth_removed} auth blocks "
+                f"hoisted/removed, {self.examples_trimmed} examples trimmed, {self.examples_dropped} dropped")
+
+
+def _key(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def _iter_requests(items):
+    for item in items or []:
+        if 'item' in item:
+            yield from _iter_requests(item['item'])
+        elif isinstance(item.get('request'), dict):
+            yield item
+
+
+# --- auth --------------------------------------------------------------------
+
+def _get_auth(node):
+    return node['request'].get('auth') if isinstance(node.get('request'), dict) else node.get('auth')
+
+
+def _pop_auth(node):
+    target = node['request'] if isinstance(node.get('request'), dict) else node
+    target.pop('auth', None)
+
+
+def _hoist_auth(container, report, min_requests):
+    """Bottom-up: a folder without auth takes the auth that every child declares identically."""
+    children = container.get('item') or []
+    for child in children:
+        if 'item' in child:
+            _hoist_auth(child, report, min_requests)
+    if container.get('auth') or len(children) < min_requests:
+        return
+    auths = [_get_auth(child) for child in children]
+    if not all(auths) or len({_key(a) for a in auths}) != 1:
+        return
+    container['auth'] = auths[0]
+    for child in children:
+        _pop_auth(child)
+    report.auth_hoisted += len(children)
+
+
+def _drop_inherited_auth(container, inherited, report):
+    """Top-down: remove auth that equals what the item would inherit."""
+    for child in container.get('item') or []:
+        auth = _get_auth(child)
+        if auth and inherited and _key(auth) == _key(inherited):
+            _pop_auth(child)
+            report.auth_removed += 1
+            auth = None
+        if 'item' in child:
+            _drop_inherited_auth(child, auth or inherited, report)
+
+
+# --- headers -----------------------------------------------------------------
+
+def _hoistable_headers(item):
+    """{(lower key, value): header} for headers that can move into a script unchanged."""
+    headers = item['request'].get('header')
+    if not isinstance(headers, list):
+        return {}
+    counts = {}
+    for header in headers:
+        counts[str(header.get('key', '')).lower()] = counts.get(str(header.get('key', '')).lower(), 0) + 1
+    result = {}
+    for header in headers:
+        key, value = header.get('key'), header.get('value')
+        if (not key or not isinstance(value, str) or header.get('disabled') or header.get('description')
+                or '{{' in value or counts[key.lower()] > 1):
+            continue   # variables, docs, duplicates and disabled headers stay on the request
+        result[(key.lower(), value)] = header
+    return result
+
+
+def _header_script(headers):
+    pairs = json.dumps([{"key": h['key'], "value": h['value']} for h in headers], separators=(',', ':'))
+    return [
+        HEADER_SCRIPT_MARKER,
+        f"{pairs}.forEach(function (h) {{",
+        "    if (!pm.request.headers.has(h.key)) { pm.request.headers.add(h); }",
+        "});",
+    ]
+
+
+def _has_header_script(container):
+    return any((e.get('script') or {}).get('exec', [None])[:1] == [HEADER_SCRIPT_MARKER]
+               for e in container.get('event') or [])
+
+
+def _hoist_headers(container, hoisted, report, min_requests):
+    """Top-down: headers common to every request under a folder move into that folder's script."""
+    items = list(_iter_requests(container.get('item')))
+    if len(items) >= min_requests and not _has_header_script(container):
+        per_request = [_hoistable_headers(item) for item in items]
+        common = set(per_request[0]).intersection(*per_request[1:])
+        common = [pair for pair in per_request[0] if pair in common and pair[0] not in hoisted]
+        if common:
+            container.setdefault('event', []).append({
+                "listen": "prerequest",
+                "script": {"type": "text/javascript", "exec": _header_script([per_request[0][p] for p in common])},
+            })
+            for item in items:
+                item['request']['header'] = [
+                    h for h in item['request']['header']
+                    if h.get('disabled') or (str(h.get('key', '')).lower(), h.get('value')) not in common
+                ]
+            report.headers_hoisted += len(common) * len(items)
+            hoisted = hoisted | {key for key, _ in common}
+    for child in container.get('item') or []:
+        if 'item' in child:
+            _hoist_headers(child, hoisted, report, min_requests)
+
+
+# --- examples ----------------------------------------------------------------
+
+def _trim_original_request(example, request, mode):
+    original = example.get('originalRequest')
+    if not isinstance(original, dict) or mode == 'full':
+        return False
+    if mode == 'none':
+        del example['originalRequest']
+        return True
+    trimmed = False
+    for field in list(original):
+        if field == 'method' or field not in request:
+            continue
+        if field == 'url':
+            # Kept so the example still shows its endpoint; the raw string is enough
+            if isinstance(original['url'], dict) and 'raw' in original['url'] \
+                    and _key(original['url']) == _key(request['url']):
+                original['url'] = original['url']['raw']
+                trimmed = True
+        elif field == 'header' and isinstance(original['header'], list) and isinstance(request['header'], list):
+            # Exports add placeholder headers (e.g. Authorization: <token>); keep only those
+            shared = {_key(h) for h in request['header']}
+            extra = [h for h in original['header'] if _key(h) not in shared]
+            if len(extra) < len(original['header']):
+                original['header'] = extra
+                trimmed = True
+        elif _key(original[field]) == _key(request[field]):
+            del original[field]
+            trimmed = True
+    return trimmed
+
+
+def _compact_examples(item, policy, report):
+    examples = item.get('response')
+    if not isinstance(examples, list):
+        return
+    kept, seen = [], set()
+    limit = policy['max_example_body_bytes']
+    for example in examples:
+        if not isinstance(example, dict):
+            kept.append(example)
+            continue
+        body = example.get('body') or ''
+        if limit is not None and len(body.encode('utf-8')) > limit:
+            report.examples_dropped += 1
+            continue
+        if policy['dedupe_examples']:
+            signature = _key({k: example.get(k) for k in ('code', 'status', 'header', 'body')})
+            if signature in seen:
+                report.examples_dropped += 1
+                continue
+            seen.add(signature)
+        if _trim_original_request(example, item['request'], policy['example_request']):
+            report.examples_trimmed += 1
+        kept.append(example)
+    if policy['max_examples_per_request'] is not None and len(kept) > policy['max_examples_per_request']:
+        report.examples_dropped += len(kept) - policy['max_examples_per_request']
+        kept = kept[:policy['max_examples_per_request']]
+    item['response'] = kept
+
+
+# --- prune -------------------------------------------------------------------
+
+def _prune_empty(node, report):
+    if isinstance(node, dict):
+        for key in [k for k in PRUNABLE_EMPTY if k in node]:
+            if node[key] in ([], '', None):
+                del node[key]
+                report.fields_pruned += 1
+        for value in node.values():
+            _prune_empty(value, report)
+    elif isinstance(node, list):
+        for value in node:
+            _prune_empty(value, report)
+
+
+def compact_collection(collection, policy=None):
+    """Return (compacted copy, CompactionReport). The input is not modified."""
+    policy = dict(DEFAULT_POLICY, **(policy or {}))
+    if policy['example_request'] not in EXAMPLE_REQUEST_MODES:
+        raise ValueError(f"example_request must be one of: {', '.join(EXAMPLE_REQUEST_MODES)}")
+    report = CompactionReport()
+    # Baseline: what a plain `requests.put(json=...)` upload of the original sends
+    report.bytes_before = len(json.dumps(collection).encode('utf-8'))
+
+    result = copy.deepcopy(collection)
+    # Examples first: originalRequest is compared with the request before hoisting edits it
+    for item in _iter_requests(result.get('item')):
+        _compact_examples(item, policy, report)
+    min_requests = policy['min_requests_to_hoist']
+    if policy['hoist_auth']:
+        _hoist_auth(result, report, min_requests)
+        _drop_inherited_auth(result, result.get('auth'), report)
+    if policy['hoist_headers']:
+        _hoist_headers(result, frozenset(), report, min_requests)
+    if policy['prune_empty']:
+        _prune_empty(result, report)
+
+    report.bytes_structured = len(json.dumps(result).encode('utf-8'))
+    report.bytes_after = len(canonical_bytes(result))
+    return result, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact a Postman collection file without changing its requests")
+    parser.add_argument('collection', help="collection JSON (bare or {\"collection\": ...} envelope)")
+    parser.add_argument('-o', '--output', help="write the compacted collection here (default: report only)")
+    parser.add_argument('--example-request', choices=EXAMPLE_REQUEST_MODES, default=DEFAULT_POLICY['example_request'])
+    parser.add_argument('--max-examples', type=int, default=None, help="examples kept per request")
+    parser.add_argument('--max-example-bytes', type=int, default=None, help="drop examples with larger bodies")
+    parser.add_argument('--hoist-headers', action='store_true',
+                        help="move shared headers into folder scripts (hidden from the UI and docs)")
+    parser.add_argument('--no-hoist-auth', action='store_true')
+    args = parser.parse_args(argv)
+
+    with open(args.collection, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    enveloped = 'collection' in data and 'info' not in data
+    collection = data['collection'] if enveloped else data
+
+    compacted, report = compact_collection(collection, {
+        "example_request": args.example_request,
+        "max_examples_per_request": args.max_examples,
+        "max_example_body_bytes": args.max_example_bytes,
+        "hoist_headers": args.hoist_headers,
+        "hoist_auth": not args.no_hoist_auth,
+    })
+    print(f"🗜️  {args.collection}: {report.summary()}")
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(canonical_bytes({"collection": compacted} if enveloped else compacted))
+        print(f"   ✅ Written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,456 @@
+import io
+import json
+import re
+
+from collection_stream import (CollectionReader, CollectionWriter, Folder, Spool, iter_events,
+                               ROOT, FOLDER_START, FOLDER_END)
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - THREE-WAY COLLECTION MERGE
+# =============================================================================
+#
+# ROLE: Re-sync a live collection with a freshly generated one WITHOUT losing
+#       the tests, scripts and examples developers added by hand.
+#
+# INPUTS:
+#   base   - the collection we generated last time (stored locally)
+#   theirs - the live collection as it exists in Postman today
+#   ours   - the collection newly generated from the spec
+#
+# RULES:
+#   - Spec-owned fields (method, url, body, ...) follow the spec unless only the
+#     developer changed them since the last sync.
+#   - Events (pre-request/test scripts) and saved responses are merged as lists:
+#     anything the developer added is kept, anything they removed stays removed.
+#   - Requests added by hand (not in base) are kept; requests removed from the
+#     spec (in base, not in ours) are dropped.
+#   - Several live requests may share a key (a developer duplicated a request
+#     to try another payload). Only the one descending from the base request
+#     (same name, else same folder) is merged; the copies are kept untouched.
+#   - Folders that only exist live are kept with their name, auth and scripts.
+#
+# Items are matched in O(n) through a dict index keyed by operationId (when the
+# spec provides one) or by "METHOD /path".
+#
+# MEMORY: merge_files() reads all three collections with collection_stream.
+# The request bytes of base and theirs are spooled to a temp file and indexed
+# by offset; ours is read twice (once for its folders and keys, once to write
+# the result), and only the request being merged is ever decoded. What stays
+# in memory grows with the NUMBER of requests and folders (a name, a key and
+# two offsets per request, folder headers, root fields), not with their size:
+# saved examples and bodies are never held. merge_collections() runs the same
+# merge on dicts that are already in memory.
+# =============================================================================
+
+# Keys Postman assigns server-side. They differ between every generated copy,
+# so they are stripped from base/ours and always taken from the live collection.
+VOLATILE_KEYS = ('id', 'uid', '_postman_id', '_exporter_id', '_collection_link')
+
+_PATH_PARAM = re.compile(r'^(:.+|\{\{?[^}]+\}?\})$')
+
+
+def strip_volatile(node):
+    """Return a deep copy of a collection node without server-assigned ids."""
+    if isinstance(node, dict):
+        return {k: strip_volatile(v) for k, v in node.items() if k not in VOLATILE_KEYS}
+    if isinstance(node, list):
+        return [strip_volatile(v) for v in node]
+    return node
+
+
+def operation_index(spec_data):
+    """Map "METHOD /path" -> operationId for every operation in an OpenAPI spec."""
+    index = {}
+    for path, path_item in (spec_data or {}).get('paths', {}).items():
+        for method, operation in (path_item or {}).items():
+            if isinstance(operation, dict) and operation.get('operationId'):
+                index[f"{method.upper()} {_normalize_path(path.strip('/').split('/'))}"] = operation['operationId']
+    return index
+
+
+def _normalize_path(segments):
+    # ':refundId', '{refundId}' and '{{refundId}}' all describe the same slot
+    return '/' + '/'.join('{}' if _PATH_PARAM.match(s) else s for s in segments if s)
+
+
+def item_key(item, op_index=None):
+    """Stable identity of a request item: operationId or "METHOD /path"."""
+    request = item.get('request')
+    if not isinstance(request, dict):
+        return None
+    url = request.get('url') or {}
+    if isinstance(url, str):
+        segments = re.sub(r'^\{\{[^}]+\}\}', '', url.split('?')[0]).split('/')
+    else:
+        segments = url.get('path') or []
+    key = f"{request.get('method', 'GET').upper()} {_normalize_path(segments)}"
+    if op_index and key in op_index:
+        return op_index[key]
+    return key
+
+
+def _fingerprint(value):
+    return json.dumps(strip_volatile(value), sort_keys=True, separators=(',', ':'))
+
+
+def _event_key(event):
+    script = event.get('script') or {}
+    exec_lines = script.get('exec') or []
+    if isinstance(exec_lines, str):
+        exec_lines = [exec_lines]
+    return (event.get('listen'), '\n'.join(exec_lines))
+
+
+def _response_key(response):
+    return (response.get('name'), response.get('code'))
+
+
+def _merge_value(base, theirs, ours):
+    """Classic three-way merge of a single value. Returns (value, conflict)."""
+    if _fingerprint(theirs) == _fingerprint(ours):
+        return ours, False
+    if _fingerprint(ours) == _fingerprint(base):
+        return theirs, False          # only the developer changed it
+    if _fingerprint(theirs) == _fingerprint(base):
+        return ours, False            # only the spec changed it
+    return ours, True                 # both changed: the spec is the source of truth
+
+
+def _merge_list(base, theirs, ours, key_fn):
+    """Three-way merge of a list of keyed entries (events, saved responses)."""
+    base_keys = {key_fn(e) for e in base or []}
+    theirs_keys = {key_fn(e) for e in theirs or []}
+    ours_keys = {key_fn(e) for e in ours or []}
+
+    merged = []
+    for entry in ours or []:
+        key = key_fn(entry)
+        # Generated entry the developer deliberately deleted: respect that.
+        if key in base_keys and key not in theirs_keys:
+            continue
+        merged.append(entry)
+
+    added = 0
+    for entry in theirs or []:
+        key = key_fn(entry)
+        if key not in base_keys and key not in ours_keys:
+            merged.append(entry)      # hand-written by a developer
+            added += 1
+    return merged, added
+
+
+class MergeReport:
+    def __init__(self):
+        self.updated = 0
+        self.added_from_spec = 0
+        self.removed_from_spec = 0
+        self.kept_manual_items = 0
+        self.kept_manual_folders = 0
+        self.kept_manual_events = 0
+        self.kept_manual_examples = 0
+        self.conflicts = []
+
+    def summary(self):
+        return (f"{self.updated} updated, {self.added_from_spec} new, {self.removed_from_spec} removed, "
+                f"{self.kept_manual_items} manual requests kept, {self.kept_manual_folders} manual folders kept, "
+                f"{self.kept_manual_events} manual scripts kept, "
+                f"{self.kept_manual_examples} manual examples kept, {len(self.conflicts)} conflicts")
+
+
+def _merge_node(base, theirs, ours, report, label):
+    """Merge one dict node (request item, folder header or collection root)."""
+    base = base or {}
+    merged = {}
+    for key in list(ours.keys()) + [k for k in theirs.keys() if k not in ours]:
+        if key == 'item' or key in VOLATILE_KEYS:
+            continue                  # children: tree walk, ids: re-attached below
+        if key == 'event':
+            merged[key], added = _merge_list(base.get(key), theirs.get(key), ours.get(key), _event_key)
+            report.kept_manual_events += added
+        elif key == 'response':
+            merged[key], added = _merge_list(base.get(key), theirs.get(key), ours.get(key), _response_key)
+            report.kept_manual_examples += added
+        else:
+            value, conflict = _merge_value(base.get(key), theirs.get(key), ours.get(key))
+            if conflict:
+                report.conflicts.append(f"{label}: {key}")
+            if value is not None:
+                merged[key] = value
+
+    # Keep the live ids so Postman updates items in place instead of recreating them.
+    for key in VOLATILE_KEYS:
+        if key in theirs:
+            merged[key] = theirs[key]
+    if isinstance(merged.get('info'), dict) and isinstance(theirs.get('info'), dict):
+        merged['info'] = dict(merged['info'])
+        for key in VOLATILE_KEYS:
+            if key in theirs['info']:
+                merged['info'][key] = theirs['info'][key]
+    return merged
+
+
+class _TreeIndex:
+    """
+    One collection indexed from stream events: folder fields and children by
+    ordinal (0 is the root), folder paths, and requests by item key.
+    Requests are kept as SpooledItems in `spool`; with keep_items=False only keys are kept.
+    `on_request(item_dict, key, ordinal)` is called for every request.
+    """
+
+    def __init__(self, events, op_index, keep_items=True, on_request=None, spool=None):
+        self.root = {}
+        self.folders = [{}]
+        self.parents = [None]
+        self.children = [[]]
+        self.requests = {}          # key -> [(RequestItem, folder ordinal), ...] in document order
+        self.keys = set()
+        stack = [0]
+        for event in events:
+            kind = event[0]
+            if kind == ROOT:
+                if event[1] != 'item':
+                    self.root[event[1]] = event[2]
+            elif kind == FOLDER_START:
+                ordinal = len(self.folders)
+                self.folders.append(dict(event[1].fields))
+                self.parents.append(stack[-1])
+                self.children.append([])
+                self.children[stack[-1]].append(ordinal)
+                stack.append(ordinal)
+            elif kind == FOLDER_END:
+                # Keys after "item" (e.g. "name" in sorted output) only arrive here
+                self.folders[stack.pop()].update(event[1])
+            else:
+                item = event[1]
+                item_dict = item.to_dict()
+                key = item_key(item_dict, op_index)
+                if key is not None:
+                    self.keys.add(key)
+                if on_request is not None:
+                    on_request(item_dict, key, stack[-1])
+                if keep_items:
+                    item = spool.add(item)
+                    self.children[stack[-1]].append(item)
+                    if key is not None:
+                        self.requests.setdefault(key, []).append((item, stack[-1]))
+        # Parents always precede their children, so one forward pass resolves every path
+        self.paths = [()]
+        for ordinal in range(1, len(self.folders)):
+            self.paths.append(self.paths[self.parents[ordinal]] + (self.folders[ordinal].get('name'),))
+        self.by_path = {path: ordinal for ordinal, path in enumerate(self.paths)}
+
+
+def _generated_match(candidates, base_entry):
+    """
+    Of the live items sharing a key, pick the one that descends from the
+    generated base item: same name, else the first in the base item's folder,
+    else the first. The others are copies a developer made by hand.
+    Candidates and base_entry are (RequestItem, folder_path) pairs.
+    """
+    if not candidates or base_entry is None:
+        return None
+    base_item, base_folder = base_entry
+    for item, folder in candidates:
+        if item.name == base_item.name:
+            return item
+    for item, folder in candidates:
+        if folder == base_folder:
+            return item
+    return candidates[0][0]
+
+
+def merge_streams(base_events, theirs_events, ours_events, writer, op_index=None):
+    """
+    Three-way merge over collection_stream events, written to a CollectionWriter.
+
+    `ours_events` is a zero-argument callable returning a fresh event iterator:
+    ours is read once for its folders and keys, then again while writing.
+    Returns the MergeReport.
+    """
+    with Spool() as spool:
+        return _merge_streams(base_events, theirs_events, ours_events, writer, op_index, spool)
+
+
+def _merge_streams(base_events, theirs_events, ours_events, writer, op_index, spool):
+    report = MergeReport()
+    base = _TreeIndex(base_events, op_index, spool=spool)
+    theirs = _TreeIndex(theirs_events, op_index, spool=spool)
+
+    base_requests = {key: (entries[0][0], base.paths[entries[0][1]]) for key, entries in base.requests.items()}
+    theirs_requests = {key: [(item, theirs.paths[ordinal]) for item, ordinal in entries]
+                       for key, entries in theirs.requests.items()}
+    theirs_parent = {id(item): ordinal for entries in theirs.requests.values() for item, ordinal in entries}
+
+    # Live items that are the generated copy of a base item: merged with ours
+    # (key still in the spec) or dropped (key removed from the spec).
+    generated = {}
+    for key, base_entry in base_requests.items():
+        match = _generated_match(theirs_requests.get(key), base_entry)
+        if match is not None:
+            generated[id(match)] = key
+
+    def request_action(ours_item, key):
+        """(live item to merge with or None, whether the request is written at all)."""
+        base_entry = base_requests.get(key)
+        theirs_item = _generated_match(theirs_requests.get(key), base_entry)
+        if theirs_item is not None:
+            return theirs_item, True
+        # No live copy: the developer deleted it, unless the spec changed it since
+        return None, base_entry is None or _fingerprint(base_entry[0].to_dict()) != _fingerprint(ours_item)
+
+    written = set()         # ours folders holding at least one request that will be written
+    live_parents = {}       # ours folder -> live folders of its generated requests
+
+    def note_request(item, key, ordinal):
+        theirs_item, write = request_action(strip_volatile(item), key)
+        if write:
+            written.add(ordinal)
+        if theirs_item is not None:
+            live_parents.setdefault(ordinal, []).append(theirs_parent[id(theirs_item)])
+
+    ours = _TreeIndex(ours_events(), op_index, keep_items=False, on_request=note_request)
+    report.removed_from_spec = sum(1 for key in generated.values() if key not in ours.keys)
+
+    # ours folder -> live folder: same path, else the live folder its generated requests (or
+    # subfolders) now sit in, so a folder the developer renamed keeps its new name and scripts
+    live_folder = {ordinal: theirs.by_path[path] for ordinal, path in enumerate(ours.paths)
+                   if ordinal and path in theirs.by_path}
+    claimed = set(live_folder.values())
+    for ordinal in range(len(ours.folders) - 1, 0, -1):
+        if ordinal in live_folder:
+            continue
+        candidates = live_parents.get(ordinal, []) + [theirs.parents[live_folder[child]]
+                                                      for child in ours.children[ordinal]
+                                                      if child in live_folder]
+        match = next((c for c in candidates if c and c not in claimed), None)
+        if match is not None:
+            live_folder[ordinal] = match
+            claimed.add(match)
+
+    # A folder is written if it still has a live counterpart or a request to write; children
+    # have higher ordinals than their parents, so walking backwards folds this upwards
+    written.update(live_folder)
+    for ordinal in range(len(ours.folders) - 1, 0, -1):
+        if ordinal in written:
+            written.add(ours.parents[ordinal])
+
+    # Live folders with no ours counterpart are kept when hand-made, or when a generated
+    # folder still holds hand-made content once its generated requests are gone
+    keep_live = {}
+    generated_below = [False] * len(theirs.folders)
+    manual_below = [False] * len(theirs.folders)
+    for ordinal in range(len(theirs.folders) - 1, 0, -1):
+        for child in theirs.children[ordinal]:
+            if isinstance(child, int):
+                generated_below[ordinal] |= generated_below[child] or child in claimed
+                manual_below[ordinal] |= keep_live[child]
+            elif id(child) in generated:
+                generated_below[ordinal] = True
+            else:
+                manual_below[ordinal] = True
+        hand_made = not generated_below[ordinal] and theirs.paths[ordinal] not in base.by_path
+        keep_live[ordinal] = ordinal not in claimed and (manual_below[ordinal] or hand_made)
+
+    def write_manual_children(ordinal):
+        """Live-only content of a folder: hand-made requests and folders, in live order."""
+        for child in theirs.children[ordinal]:
+            if isinstance(child, int):
+                if keep_live[child]:
+                    report.kept_manual_folders += 1
+                    writer.start_folder(Folder(theirs.folders[child]))
+                    write_manual_children(child)
+                    writer.end_folder({})
+            elif id(child) not in generated:
+                report.kept_manual_items += 1
+                writer.request(child)
+
+    def write_request(ours_item):
+        key = item_key(ours_item, op_index)
+        theirs_item, write = request_action(ours_item, key)
+        if not write:
+            return                    # developer deleted an unchanged request
+        if theirs_item is None:
+            report.added_from_spec += 1
+            writer.request(ours_item)
+        else:
+            report.updated += 1
+            writer.request(_merge_node(strip_volatile(base_requests[key][0].to_dict()), theirs_item.to_dict(),
+                                       ours_item, report, key))
+
+    writer.begin()
+    merged_root = _merge_node(strip_volatile(base.root), theirs.root, strip_volatile(ours.root), report, 'collection')
+    for key, value in merged_root.items():
+        writer.root(key, value)
+    writer.begin_items()
+
+    stack = [0]
+    ordinal = 0
+    skipping = 0            # depth inside a folder the developer deleted
+    for event in ours_events():
+        kind = event[0]
+        if kind == ROOT:
+            continue
+        if kind == FOLDER_START:
+            ordinal += 1
+            stack.append(ordinal)
+            path = ours.paths[ordinal]
+            base_folder = base.by_path.get(path)
+            live = live_folder.get(ordinal)
+            if skipping or (live is None and base_folder and ordinal not in written):
+                skipping += 1         # generated folder deleted live, nothing new from the spec in it
+                continue
+            # Without a live folder there is nothing to merge with: the spec's header stands
+            writer.start_folder(Folder(_merge_node(
+                strip_volatile(base.folders[base_folder]) if base_folder and live else None,
+                theirs.folders[live] if live else {},
+                strip_volatile(ours.folders[ordinal]), report, '/'.join(map(str, path)))))
+        elif kind == FOLDER_END:
+            live = live_folder.get(stack.pop())
+            if skipping:
+                skipping -= 1
+                continue
+            if live:
+                write_manual_children(live)
+            writer.end_folder({})
+        elif not skipping:
+            write_request(strip_volatile(event[1].to_dict()))
+
+    write_manual_children(0)
+    writer.end_items()
+    writer.end()
+    return report
+
+
+def merge_collections(base, theirs, ours, spec_data=None, op_index=None):
+    """
+    Three-way merge of Postman Collection v2.1 documents (the inner
+    'collection' object, not the {"collection": ...} API envelope).
+
+    Items are keyed by operationId via `op_index` (or one derived from
+    `spec_data`), falling back to "METHOD /path". Several live items may share
+    a key (developers duplicate requests to try other payloads); only the one
+    descending from the base item is merged, the rest are kept as they are.
+
+    Returns (merged_collection, MergeReport). Inputs are not modified.
+    """
+    if op_index is None:
+        op_index = operation_index(spec_data)
+    out = io.StringIO()
+    report = merge_streams(iter_events(base or {}), iter_events(theirs), lambda: iter_events(ours),
+                           CollectionWriter(out, envelope=False), op_index)
+    return json.loads(out.getvalue()), report
+
+
+def merge_files(base_fp, theirs_chunks, ours_fp, out_fp, op_index=None):
+    """
+    merge_collections() without loading any collection: base and ours are
+    seekable files, theirs any iterable of chunks (e.g. resp.iter_content()).
+    The result is written to `out_fp` inside a {"collection": ...} envelope,
+    ready to be streamed as a PUT body. Returns the MergeReport.
+    """
+    def ours_events():
+        ours_fp.seek(0)
+        return CollectionReader.from_file(ours_fp).events()
+
+    return merge_streams(CollectionReader.from_file(base_fp).events(), CollectionReader(theirs_chunks).events(),
+                         ours_events, CollectionWriter(out_fp), op_index)
@@ -0,0 +1,359 @@
+import io
+import json
+import re
+import tempfile
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - STREAMING COLLECTION MODEL
+# =============================================================================
+#
+# ROLE: Read and write Postman Collection v2.1 documents item-by-item, so the
+#       merge (collection_merge.merge_files) never holds a whole collection as
+#       Python dicts.
+#
+# WHY: `resp.json()` on a multi-hundred-MB collection materializes every
+#      request, saved response and `originalRequest` copy as Python dicts, and
+#      `json=` on the PUT serializes all of it again in one string.
+#
+# MODEL:
+#   - CollectionReader scans the raw JSON incrementally (bounded buffer) and
+#     yields events: root keys, folder start/end, and one RequestItem at a time.
+#     iter_events() yields the same events from an in-memory dict.
+#   - RequestItem / Folder use __slots__ and keep the item as compact (minified)
+#     JSON bytes, decoding to a dict only when asked. A Spool moves those bytes
+#     to a temp file, leaving a SpooledItem (name + offsets) in memory.
+#   - CollectionWriter writes the same events back out incrementally, e.g. into
+#     a temp file that `requests` then streams as the PUT body.
+#
+# Works on both the API envelope ({"collection": {...}}) and on plain exported
+# collection files.
+# =============================================================================
+
+CHUNK_SIZE = 64 * 1024
+
+_WS = re.compile(r'[ \t\n\r]*')
+
+_decoder = json.JSONDecoder()
+
+
+def _compact(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+class RequestItem:
+    """A single request, held as compact JSON bytes."""
+    __slots__ = ('name', 'method', 'raw')
+
+    def __init__(self, name, method, raw):
+        self.name = name
+        self.method = method
+        self.raw = raw
+
+    @classmethod
+    def from_dict(cls, item):
+        request = item.get('request')
+        method = request.get('method') if isinstance(request, dict) else None
+        return cls(item.get('name'), method, _compact(item).encode('utf-8'))
+
+    def to_dict(self):
+        return json.loads(self.raw)
+
+
+class SpooledItem(RequestItem):
+    """A RequestItem whose bytes live in a Spool; only the name and offsets stay in memory."""
+    __slots__ = ('spool', 'offset', 'length')
+
+    def __init__(self, name, method, spool, offset, length):
+        self.name = name
+        self.method = method
+        self.spool = spool
+        self.offset = offset
+        self.length = length
+
+    @property
+    def raw(self):
+        return self.spool.read(self.offset, self.length)
+
+
+class Spool:
+    """Append-only temp file for request bytes, so an index of a collection costs offsets, not bytes."""
+
+    def __init__(self):
+        self._fp = tempfile.TemporaryFile()
+        self._end = 0
+
+    def add(self, item):
+        self._fp.seek(self._end)
+        self._fp.write(item.raw)
+        offset, self._end = self._end, self._end + len(item.raw)
+        return SpooledItem(item.name, item.method, self, offset, len(item.raw))
+
+    def read(self, offset, length):
+        self._fp.seek(offset)
+        return self._fp.read(length)
+
+    def close(self):
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Folder:
+    """Folder header (name, auth, event, ...) without its children."""
+    __slots__ = ('name', 'fields')
+
+    def __init__(self, fields):
+        self.name = fields.get('name')
+        self.fields = fields
+
+
+# Events yielded by CollectionReader.events()
+ROOT = 'root'                  # (ROOT, key, value)   - root key other than 'item'
+FOLDER_START = 'folder_start'  # (FOLDER_START, Folder)
+FOLDER_END = 'folder_end'      # (FOLDER_END, trailing_fields)
+REQUEST = 'request'            # (REQUEST, RequestItem)
+
+
+class CollectionReader:
+    """Incremental parser over an iterable of str/bytes chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._pending = b''
+        self.envelope = False
+
+    @classmethod
+    def from_file(cls, fp, chunk_size=CHUNK_SIZE):
+        return cls(iter(lambda: fp.read(chunk_size), '' if isinstance(fp, io.TextIOBase) else b''))
+
+    # --- buffer management ---------------------------------------------------
+
+    def _fill(self):
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            return False
+        if isinstance(chunk, bytes):
+            # Multi-byte sequences may be split across chunks
+            chunk = self._pending + chunk
+            try:
+                text = chunk.decode('utf-8')
+                self._pending = b''
+            except UnicodeDecodeError as exc:
+                text = chunk[:exc.start].decode('utf-8')
+                self._pending = chunk[exc.start:]
+            chunk = text
+        # Drop what has already been consumed so the buffer stays bounded
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            match = _WS.match(self._buf, self._pos)
+            self._pos = match.end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of collection JSON")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos}, got '{self._buf[self._pos]}'")
+        self._pos += 1
+
+    def _decode(self):
+        """Decode the JSON value at the cursor. Returns (value, end_offset)."""
+        self._peek()
+        reads = 1
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof or isinstance(value, (dict, list, str)):
+                    return value, end
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Value spans chunks: read geometrically more so large values stay O(n)
+            for _ in range(reads):
+                if not self._fill():
+                    break
+            reads *= 2
+
+    def _read_value(self):
+        value, self._pos = self._decode()
+        return value
+
+    def _members(self):
+        """Yield the keys of the object at the cursor; caller consumes each value."""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._read_value()
+            self._expect(':')
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' at offset {self._pos - 1}")
+
+    def _elements(self):
+        """Yield once per element of the array at the cursor."""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            char = self._peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {self._pos - 1}")
+
+    # --- public API ----------------------------------------------------------
+
+    def events(self):
+        members = self._members()
+        first = next(members, None)
+        if first == 'collection' and self._peek() == '{':
+            self.envelope = True
+            yield from self._collection_body(self._members())
+            for _ in members:              # anything after the envelope
+                self._read_value()
+        elif first is not None:
+            yield from self._collection_body(members, first)
+
+    def _collection_body(self, members, first=None):
+        keys = members if first is None else _prepend(first, members)
+        for key in keys:
+            if key == 'item' and self._peek() == '[':
+                empty = True
+                for event in self._items():
+                    empty = False
+                    yield event
+                if empty:
+                    yield ROOT, 'item', []
+            else:
+                yield ROOT, key, self._read_value()
+
+    def _items(self):
+        for _ in self._elements():
+            yield from self._item()
+
+    def _item(self):
+        fields = {}
+        is_folder = False
+        for key in self._members():
+            if key == 'item' and self._peek() == '[':
+                is_folder = True
+                yield FOLDER_START, Folder(fields)
+                yield from self._items()
+                fields = {}
+            else:
+                fields[key] = self._read_value()
+        if is_folder:
+            yield FOLDER_END, fields
+        else:
+            # Only one request is ever held as dicts; it is compacted right away
+            yield REQUEST, RequestItem.from_dict(fields)
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+class CollectionWriter:
+    """Incremental writer mirroring CollectionReader events."""
+
+    def __init__(self, fp, envelope=True):
+        self._fp = fp
+        self._envelope = envelope
+        self._first = [True]
+        self._binary = not isinstance(fp, io.TextIOBase)
+
+    def _write(self, text):
+        self._fp.write(text.encode('utf-8') if self._binary else text)
+
+    def _sep(self):
+        if self._first[-1]:
+            self._first[-1] = False
+        else:
+            self._write(',')
+
+    def begin(self):
+        self._write('{"collection":{' if self._envelope else '{')
+        self._first = [True]
+
+    def root(self, key, value):
+        self._sep()
+        self._write(f'{_compact(key)}:{_compact(value)}')
+
+    def begin_items(self):
+        self._sep()
+        self._write('"item":[')
+        self._first.append(True)
+
+    def end_items(self):
+        self._write(']')
+        self._first.pop()
+
+    def request(self, item):
+        self._sep()
+        self._write(item.raw.decode('utf-8') if isinstance(item, RequestItem) else _compact(item))
+
+    def start_folder(self, folder):
+        self._sep()
+        self._write('{')
+        self._first.append(True)
+        for key, value in folder.fields.items():
+            self.root(key, value)
+        self.begin_items()
+
+    def end_folder(self, trailing):
+        self.end_items()
+        for key, value in trailing.items():
+            self.root(key, value)
+        self._write('}')
+        self._first.pop()
+
+    def end(self):
+        self._write('}}' if self._envelope else '}')
+
+
+def iter_events(collection):
+    """CollectionReader events for a collection that is already a dict."""
+    for key, value in collection.items():
+        if key == 'item' and isinstance(value, list):
+            if not value:
+                yield ROOT, 'item', []
+            yield from _item_events(value)
+        else:
+            yield ROOT, key, value
+
+
+def _item_events(items):
+    for item in items:
+        if isinstance(item.get('item'), list):
+            yield FOLDER_START, Folder({k: v for k, v in item.items() if k != 'item'})
+            yield from _item_events(item['item'])
+            yield FOLDER_END, {}
+        else:
+            yield REQUEST, RequestItem.from_dict(item)
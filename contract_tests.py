@@ -0,0 +1,476 @@
+import re
+import sys
+import json
+import argparse
+import functools
+from datetime import datetime
+
+import yaml
+
+from collection_merge import item_key, operation_index
+from openapi_to_collection import iter_operations, resolve_ref
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - SPEC-DRIVEN CONTRACT TESTS
+# =============================================================================
+#
+# ROLE: Turn the "Green Checkmark" into a real contract check. Every response
+#       is asserted against the status codes and JSON schemas in the spec.
+#
+# TWO OUTPUTS, ONE SOURCE:
+#   1. pm.test scripts added to each request of the generated collection
+#      (Postman / Newman runs).
+#   2. A Python runner for bulk validation (e.g. every response of a load run):
+#        python contract_tests.py --spec payment-refund-api-openapi.yaml responses.jsonl
+#      Each JSONL line: {"method": "GET", "url": ".../refunds/rf_1", "status": 200, "body": {...}}
+#
+# PERFORMANCE: Each schema is compiled ONCE into nested Python closures (no
+# re-walking of the schema per response), shared across operations via a
+# $ref cache, and routes are matched through precompiled regexes.
+# =============================================================================
+
+TEST_SCRIPT_MARKER = "// Contract tests generated from the OpenAPI spec (contract_tests.py)"
+
+ROUTE_CACHE_SIZE = 4096             # distinct (method, URL path) pairs remembered by match()
+_STATUS_RANGE = re.compile(r'^[1-5]XX$')
+
+_JSON_TYPES = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool)
+                         or isinstance(v, float) and v.is_integer(),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def _is_datetime(value):
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return 'T' in value or ' ' in value
+    except ValueError:
+        return False
+
+
+def _is_date(value):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+
+_FORMATS = {
+    'date-time': _is_datetime,
+    'date': _is_date,
+    'uuid': re.compile(r'^[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$').match,
+    'email': re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$').match,
+}
+
+
+# =============================================================================
+# SCHEMA COMPILER
+# =============================================================================
+
+class SchemaCompiler:
+    """Compiles OpenAPI 3.0 schemas into validator closures: fn(value, path, errors)."""
+
+    def __init__(self, spec_data):
+        self.spec_data = spec_data
+        self._refs = {}
+
+    def compile(self, schema):
+        if isinstance(schema, dict) and '$ref' in schema:
+            return self._compile_ref(schema['$ref'])
+        return self._compile(schema or {})
+
+    def _compile_ref(self, ref):
+        if ref in self._refs:
+            return self._refs[ref]
+        # Register a trampoline first so recursive schemas terminate
+        slot = []
+
+        def by_ref(value, path, errors):
+            slot[0](value, path, errors)
+
+        self._refs[ref] = by_ref
+        slot.append(self._compile(resolve_ref(self.spec_data, {'$ref': ref})))
+        return by_ref
+
+    def _compile(self, schema):
+        checks = []
+        nullable = schema.get('nullable', False)
+
+        schema_type = schema.get('type')
+        if schema_type:
+            types = schema_type if isinstance(schema_type, list) else [schema_type]
+            type_checks = [_JSON_TYPES[t] for t in types if t in _JSON_TYPES]
+            expected = '/'.join(types)
+
+            def check_type(value, path, errors):
+                if not any(check(value) for check in type_checks):
+                    errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+                    return False
+                return True
+            checks.append(check_type)
+
+        if 'enum' in schema:
+            allowed = schema['enum']
+
+            def check_enum(value, path, errors):
+                if value not in allowed:
+                    errors.append(f"{path}: {value!r} not in {allowed}")
+            checks.append(check_enum)
+
+        checks.extend(self._number_checks(schema))
+        checks.extend(self._string_checks(schema))
+        checks.extend(self._object_checks(schema))
+        checks.extend(self._array_checks(schema))
+        checks.extend(self._combinator_checks(schema))
+
+        checks = tuple(checks)
+
+        def validate(value, path, errors):
+            if value is None and nullable:
+                return
+            for check in checks:
+                # A failed type check makes the remaining checks meaningless
+                if check(value, path, errors) is False:
+                    return
+        return validate
+
+    def _number_checks(self, schema):
+        checks = []
+        for key, op, exclusive_key, word in (('minimum', lambda v, b: v < b, 'exclusiveMinimum', '>='),
+                                             ('maximum', lambda v, b: v > b, 'exclusiveMaximum', '<=')):
+            if key not in schema:
+                continue
+            bound = schema[key]
+            exclusive = schema.get(exclusive_key) is True
+
+            def check(value, path, errors, bound=bound, op=op, exclusive=exclusive, word=word):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    if op(value, bound) or (exclusive and value == bound):
+                        errors.append(f"{path}: {value} violates {word} {bound}")
+            checks.append(check)
+        return checks
+
+    def _string_checks(self, schema):
+        checks = []
+        min_len, max_len = schema.get('minLength'), schema.get('maxLength')
+        if min_len is not None or max_len is not None:
+            def check_length(value, path, errors):
+                if isinstance(value, str):
+                    if min_len is not None and len(value) < min_len:
+                        errors.append(f"{path}: shorter than {min_len}")
+                    if max_len is not None and len(value) > max_len:
+                        errors.append(f"{path}: longer than {max_len}")
+            checks.append(check_length)
+
+        if 'pattern' in schema:
+            pattern = re.compile(schema['pattern'])
+
+            def check_pattern(value, path, errors):
+                if isinstance(value, str) and not pattern.search(value):
+                    errors.append(f"{path}: does not match {pattern.pattern}")
+            checks.append(check_pattern)
+
+        format_check = _FORMATS.get(schema.get('format'))
+        if format_check:
+            name = schema['format']
+
+            def check_format(value, path, errors):
+                if isinstance(value, str) and not format_check(value):
+                    errors.append(f"{path}: not a valid {name}")
+            checks.append(check_format)
+        return checks
+
+    def _object_checks(self, schema):
+        checks = []
+        required = tuple(schema.get('required') or ())
+        properties = {name: self.compile(prop) for name, prop in (schema.get('properties') or {}).items()}
+        additional = schema.get('additionalProperties', True)
+        additional_validator = self.compile(additional) if isinstance(additional, dict) else None
+
+        if required:
+            def check_required(value, path, errors):
+                if isinstance(value, dict):
+                    for name in required:
+                        if name not in value:
+                            errors.append(f"{path}: missing required '{name}'")
+            checks.append(check_required)
+
+        if properties or additional is not True:
+            def check_properties(value, path, errors):
+                if not isinstance(value, dict):
+                    return
+                for name, item in value.items():
+                    validator = properties.get(name)
+                    if validator is not None:
+                        validator(item, f"{path}.{name}", errors)
+                    elif additional is False:
+                        errors.append(f"{path}: unexpected property '{name}'")
+                    elif additional_validator is not None:
+                        additional_validator(item, f"{path}.{name}", errors)
+            checks.append(check_properties)
+        return checks
+
+    def _array_checks(self, schema):
+        checks = []
+        min_items, max_items = schema.get('minItems'), schema.get('maxItems')
+        items_validator = self.compile(schema['items']) if 'items' in schema else None
+
+        if min_items is not None or max_items is not None:
+            def check_size(value, path, errors):
+                if isinstance(value, list):
+                    if min_items is not None and len(value) < min_items:
+                        errors.append(f"{path}: fewer than {min_items} items")
+                    if max_items is not None and len(value) > max_items:
+                        errors.append(f"{path}: more than {max_items} items")
+            checks.append(check_size)
+
+        if items_validator is not None:
+            def check_items(value, path, errors):
+                if isinstance(value, list):
+                    for i, item in enumerate(value):
+                        items_validator(item, f"{path}[{i}]", errors)
+            checks.append(check_items)
+        return checks
+
+    def _combinator_checks(self, schema):
+        checks = []
+        if schema.get('allOf'):
+            parts = tuple(self.compile(s) for s in schema['allOf'])
+
+            def check_all(value, path, errors):
+                for part in parts:
+                    part(value, path, errors)
+            checks.append(check_all)
+
+        for key, needed in (('anyOf', 'any'), ('oneOf', 'one')):
+            if not schema.get(key):
+                continue
+            parts = tuple(self.compile(s) for s in schema[key])
+
+            def check_some(value, path, errors, parts=parts, needed=needed, key=key):
+                matches = 0
+                for part in parts:
+                    part_errors = []
+                    part(value, path, part_errors)
+                    matches += not part_errors
+                if matches == 0 or (needed == 'one' and matches > 1):
+                    errors.append(f"{path}: matches {matches} of {key}")
+            checks.append(check_some)
+        return checks
+
+
+# =============================================================================
+# OPERATION CONTRACTS
+# =============================================================================
+
+def _response_schema(spec_data, response):
+    response = resolve_ref(spec_data, response or {})
+    for media_type, media in (response.get('content') or {}).items():
+        if 'json' in media_type:
+            return (media or {}).get('schema')
+    return None
+
+
+class ContractValidator:
+    """All operations of one spec, compiled once. Reuse it for every response."""
+
+    def __init__(self, spec_data):
+        self.compiler = SchemaCompiler(spec_data)
+        self.routes = []              # (method, regex, operation_id, {status: validator})
+        for method, path, _, operation in iter_operations(spec_data):
+            pattern = re.compile('(?:^|/)' + re.sub(r'\\\{[^/]+?\\\}', '[^/]+', re.escape(path.strip('/'))) + '/?$')
+            validators = {}
+            for status, response in (operation.get('responses') or {}).items():
+                schema = _response_schema(spec_data, response)
+                validators[str(status)] = self.compiler.compile(schema) if schema else None
+            name = operation.get('operationId') or f"{method.upper()} {path}"
+            segments = path.strip('/').split('/')
+            # Most specific first: longer templates, then literal segments before {params} at the
+            # same depth, so /refunds/{id}/status beats /refunds/{id} and /refunds/search beats it too
+            specificity = (-len(segments), tuple('{' in segment for segment in segments))
+            self.routes.append((method.upper(), pattern, name, validators, specificity))
+        self.routes.sort(key=lambda route: route[4])
+        # Concrete paths are unbounded (one per resource id), so the cache is too unless capped
+        self._find_route = functools.lru_cache(maxsize=ROUTE_CACHE_SIZE)(self._find_route)
+
+    def _find_route(self, method, path):
+        return next((route for route in self.routes if route[0] == method and route[1].search(path)), None)
+
+    def match(self, method, url):
+        path = re.sub(r'^[a-z]+://[^/]+', '', url.split('?', 1)[0]).rstrip('/')
+        return self._find_route(method.upper(), path)
+
+    def validate(self, method, url, status, body):
+        """Returns (operation_name, [errors]). operation_name is None if unmatched."""
+        route = self.match(method, url)
+        if route is None:
+            return None, [f"{method.upper()} {url}: no matching operation in spec"]
+        _, _, name, validators, _ = route
+        status = str(status)
+        if status in validators:
+            validator = validators[status]
+        elif f"{status[0]}XX" in validators:
+            validator = validators[f"{status[0]}XX"]
+        elif 'default' in validators:
+            validator = validators['default']
+        else:
+            return name, [f"status {status} is not documented (expected {', '.join(validators)})"]
+        errors = []
+        if validator is not None:
+            validator(body, '$', errors)
+        return name, errors
+
+    def validate_many(self, records):
+        """Bulk validation. Returns {operation: {"passed": n, "failed": n, "errors": [first few]}}."""
+        summary = {}
+        for record in records:
+            name, errors = self.validate(record.get('method', 'GET'), record.get('url', ''),
+                                         record.get('status', 200), record.get('body'))
+            entry = summary.setdefault(name or '(unmatched)', {"passed": 0, "failed": 0, "errors": []})
+            if errors:
+                entry["failed"] += 1
+                if len(entry["errors"]) < 5:
+                    entry["errors"].extend(errors[:5 - len(entry["errors"])])
+            else:
+                entry["passed"] += 1
+        return summary
+
+
+# =============================================================================
+# pm.test GENERATION (collection side)
+# =============================================================================
+
+def to_json_schema(spec_data, schema, depth=0, stack=()):
+    """Inline $refs and translate OpenAPI-only keywords for pm's jsonSchema()."""
+    if isinstance(schema, dict) and '$ref' in schema:
+        ref = schema['$ref']
+        if ref in stack or depth > 20:
+            return {}                 # recursive schema: stop inlining here
+        return to_json_schema(spec_data, resolve_ref(spec_data, schema), depth + 1, stack + (ref,))
+    if isinstance(schema, list):
+        return [to_json_schema(spec_data, s, depth + 1, stack) for s in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    result = {}
+    for key, value in schema.items():
+        if key in ('nullable', 'example', 'examples', 'xml', 'externalDocs', 'discriminator',
+                   'readOnly', 'writeOnly', 'deprecated', 'description'):
+            continue
+        if key in ('properties',):
+            result[key] = {name: to_json_schema(spec_data, prop, depth + 1, stack) for name, prop in value.items()}
+        elif isinstance(value, (dict, list)):
+            result[key] = to_json_schema(spec_data, value, depth + 1, stack)
+        else:
+            result[key] = value
+    if schema.get('nullable') and 'type' in result:
+        result['type'] = [result['type'], 'null'] if isinstance(result['type'], str) else result['type'] + ['null']
+    return result
+
+
+def build_test_script(spec_data, operation):
+    """pm.test lines for one operation (status codes + response schema)."""
+    responses = operation.get('responses') or {}
+    # Same rules as ContractValidator.validate: exact codes, then "4XX"-style ranges, then default
+    codes = [int(code) for code in responses if str(code).isdigit()]
+    codes += [str(code) for code in responses if _STATUS_RANGE.match(str(code))]
+    schemas = {}
+    for status, response in responses.items():
+        schema = _response_schema(spec_data, response)
+        if schema:
+            schemas[str(status)] = to_json_schema(spec_data, schema)
+
+    lines = [TEST_SCRIPT_MARKER]
+    if codes and 'default' not in responses:
+        lines += [
+            'pm.test("Status code is documented in the spec", function () {',
+            f'    const documented = {json.dumps(codes)};',
+            '    const code = pm.response.code;',
+            '    pm.expect(documented).to.include(documented.includes(code) ? code : String(code)[0] + "XX");',
+            '});',
+        ]
+    if schemas:
+        lines += [
+            f'const contractSchemas = {json.dumps(schemas, separators=(",", ":"))};',
+            'const contractSchema = contractSchemas[String(pm.response.code)]',
+            '    || contractSchemas[String(pm.response.code)[0] + "XX"] || contractSchemas["default"];',
+            'if (contractSchema && (pm.response.headers.get("Content-Type") || "").includes("json")) {',
+            '    pm.test("Response body matches the spec schema", function () {',
+            '        pm.response.to.have.jsonSchema(contractSchema);',
+            '    });',
+            '}',
+        ]
+    return lines if len(lines) > 1 else None
+
+
+def add_contract_tests(collection, spec_data):
+    """Attach a generated 'test' event to every request that maps to an operation."""
+    op_index = operation_index(spec_data)
+    scripts = {}
+    for method, path, _, operation in iter_operations(spec_data):
+        key = item_key({"request": {"method": method, "url": {"path": path.strip('/').split('/')}}}, op_index)
+        scripts[key] = build_test_script(spec_data, operation)
+
+    def walk(items):
+        count = 0
+        for item in items or []:
+            if 'item' in item:
+                count += walk(item['item'])
+                continue
+            script = scripts.get(item_key(item, op_index))
+            if not script:
+                continue
+            events = [e for e in item.get('event', [])
+                      if (e.get('script') or {}).get('exec', [None])[:1] != [TEST_SCRIPT_MARKER]]
+            events.append({"listen": "test", "script": {"type": "text/javascript", "exec": script}})
+            item['event'] = events
+            count += 1
+        return count
+
+    return walk(collection.get('item'))
+
+
+# =============================================================================
+# CLI RUNNER
+# =============================================================================
+
+def _read_records(paths):
+    for path in paths:
+        stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+        with stream:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate recorded API responses against the OpenAPI spec")
+    parser.add_argument('--spec', default="payment-refund-api-openapi.yaml")
+    parser.add_argument('responses', nargs='+', help="JSONL files of {method, url, status, body} ('-' for stdin)")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        validator = ContractValidator(yaml.safe_load(f))
+
+    print(f"\n🧪 CONTRACT TESTS: {args.spec}")
+    summary = validator.validate_many(_read_records(args.responses))
+    failed = 0
+    for name, entry in sorted(summary.items()):
+        failed += entry['failed']
+        icon = "✅" if not entry['failed'] else "❌"
+        print(f"   {icon} {name}: {entry['passed']} passed, {entry['failed']} failed")
+        for error in entry['errors']:
+            print(f"        - {error}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,26 @@
+import io
 import os
 import sys
 import json
 import requests
 import yaml
 import time
+import re
+import glob
+import fnmatch
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from artifact_store import ArtifactStore, DEFAULT_ROOT
+from collection_compaction import compact_collection, DEFAULT_POLICY as COMPACTION_POLICY
+from collection_merge import merge_files, operation_index
+from collection_stream import CHUNK_SIZE
+from contract_tests import add_contract_tests
+from openapi_to_collection import convert
+from profiling import PROFILER, DEFAULT_OUTPUT_DIR as PROFILE_DIR
+from sharding import SHARD_STRATEGIES, shard_spec
 
 # =============================================================================
 # POSTMAN ADOPTION STARTER KIT - INGESTION ENGINE
@@ -18,6 +35,18 @@ import time
 # 3. Block C (The Builder): Generate a Postman Collection from the Spec.
 # 4. Block D (The Configurator): Create an Environment with dynamic URLs and Auth placeholders.
 # 5. Block E (The Injector): Inject the local 'jwt_mock.js' to enable "Green Checkmark" testing.
+#
+# STAGES:
+#   build - Blocks A-E computed OFFLINE into a content-addressed artifact
+#           directory (no Postman calls, parallel across specs).
+#   apply - Uploads only the artifacts whose hash differs from what was last
+#           published. Safe to re-run: progress is recorded per artifact.
+#   run   - build + apply (default, same as the original single pass).
+#
+# USAGE:
+#   python ingest_api.py                          # run on the default spec
+#   python ingest_api.py build specs/*.yaml       # offline
+#   python ingest_api.py apply                    # publish what changed
 # =============================================================================
 
 # --- Configuration ---
@@ -26,72 +55,135 @@ SPEC_FILE = "payment-refund-api-openapi.yaml"
 MOCK_SCRIPT_FILE = "jwt_mock.js"
 BASE_URL = "https://api.getpostman.com"
 
+# Build artifacts + publish record (see artifact_store.py)
+ARTIFACT_DIR = os.getenv('POSTMAN_ARTIFACT_DIR', DEFAULT_ROOT)
+
+# Network retries for the apply stage (429 / 5xx / connection errors)
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 2
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+# Concurrent collection uploads when a spec is sharded (--shard-by)
+UPLOAD_WORKERS = 8
+
+# Compact collections before upload (see collection_compaction.py); POSTMAN_COMPACT=0 disables
+COMPACT_COLLECTIONS = os.getenv('POSTMAN_COMPACT', '1') != '0'
+
 # WORKSPACE CONFIGURATION
 # Option 1: Set via environment variable POSTMAN_WORKSPACE_ID (exact ID)
 # Option 2: Set via environment variable POSTMAN_WORKSPACE_NAME (searches by name)
 # Option 3: Falls back to "My Workspace" (Postman's default workspace name)
 TARGET_WORKSPACE_ID = os.getenv('POSTMAN_WORKSPACE_ID', None)
 TARGET_WORKSPACE_NAME = os.getenv('POSTMAN_WORKSPACE_NAME', 'My Workspace')
+# Option 4: POSTMAN_WORKSPACES / --workspaces: comma-separated IDs or name globs
+#           ("Team *") to publish the same artifacts to every match (fan-out)
+TARGET_WORKSPACES = os.getenv('POSTMAN_WORKSPACES', None)
+FANOUT_WORKERS = 8
 
-print("\n🚀 STARTING POSTMAN ADOPTION KIT ENGINE...\n")
 
-# Load API Key from environment variable
-API_KEY = os.getenv('POSTMAN_API_KEY')
-if not API_KEY:
-    print("❌ ERROR: POSTMAN_API_KEY environment variable not set!")
-    print("   Set it with: export POSTMAN_API_KEY='your-api-key'")
-    print("   See .env.example for configuration template")
-    sys.exit(1)
+class IngestError(Exception):
+    """A spec or publish step failed; the message is user-facing."""
 
-print("🔒 Credentials loaded from environment variable")
 
+def spec_slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
 
 
-headers = {
-    "X-Api-Key": API_KEY,
-    "Content-Type": "application/json"
-}
+def _check_slug_owner(store, slug, spec_file, name):
+    """
+    The slug keys the manifest, the publish record and the merge base, so two
+    specs sharing a title would silently share one API and collection.
+    """
+    existing = store.manifest(slug)
+    if not existing or os.path.realpath(existing['spec_file']) == os.path.realpath(spec_file):
+        return
+    try:
+        still_owned = spec_slug(read_spec(existing['spec_file'])['name']) == slug
+    except IngestError:
+        still_owned = False       # the other spec is gone or was retitled: the slug is free
+    if still_owned:
+        raise IngestError(f"'{spec_file}' and '{existing['spec_file']}' both have the title '{name}'; "
+                          f"give one of them a distinct info.title")
+
+
+def load_headers():
+    # Load API Key from environment variable
+    api_key = os.getenv('POSTMAN_API_KEY')
+    if not api_key:
+        print("❌ ERROR: POSTMAN_API_KEY environment variable not set!")
+        print("   Set it with: export POSTMAN_API_KEY='your-api-key'")
+        print("   See .env.example for configuration template")
+        sys.exit(1)
+
+    print("🔒 Credentials loaded from environment variable")
+    return {
+        "X-Api-Key": api_key,
+        "Content-Type": "application/json"
+    }
 
-# Helper: Get Workspace ID
-# Priority: 1) Configured ID, 2) Configured Name, 3) Auto-select first
-WORKSPACE_ID = None
 
-if TARGET_WORKSPACE_ID:
-    # User specified an exact ID
-    WORKSPACE_ID = TARGET_WORKSPACE_ID
-    print(f"➡️  Using configured Workspace ID: {WORKSPACE_ID}")
-else:
+def api_request(method, url, headers, session=None, **kwargs):
+    """
+    requests.request (or session.request) with retry/backoff on throttling and transient errors.
+
+    Only idempotent methods are retried on 5xx and dropped connections: a POST
+    that timed out at the gateway may still have created its collection, so it
+    is retried on 429 (rejected before any work was done) and nothing else.
+    """
+    body = kwargs.get('data')
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    for attempt in range(MAX_RETRIES + 1):
+        if hasattr(body, 'seek'):
+            body.seek(0)          # streamed bodies must be rewound for a retry
+        try:
+            resp = (session or requests).request(method, url, headers=headers, **kwargs)
+        except requests.ConnectionError:
+            if attempt == MAX_RETRIES or not idempotent:
+                raise
+        else:
+            retryable = resp.status_code == 429 or idempotent and resp.status_code >= 500
+            if not retryable or attempt == MAX_RETRIES:
+                return resp
+        time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+
+
+def resolve_workspace_id(headers):
+    # Helper: Get Workspace ID
+    # Priority: 1) Configured ID, 2) Configured Name, 3) Auto-select first
+    if TARGET_WORKSPACE_ID:
+        # User specified an exact ID
+        print(f"➡️  Using configured Workspace ID: {TARGET_WORKSPACE_ID}")
+        return TARGET_WORKSPACE_ID
+
     try:
-        ws_resp = requests.get(f"{BASE_URL}/workspaces", headers=headers)
+        ws_resp = api_request('GET', f"{BASE_URL}/workspaces", headers)
         ws_resp.raise_for_status()
         workspaces = ws_resp.json().get('workspaces', [])
-        
-        if not workspaces:
-            print("❌ No Workspaces found. Please create one in Postman.")
-            sys.exit(1)
-        
-        # Search by name if configured
-        if TARGET_WORKSPACE_NAME:
-            target_ws = next((ws for ws in workspaces if TARGET_WORKSPACE_NAME.lower() in ws['name'].lower()), None)
-            if target_ws:
-                WORKSPACE_ID = target_ws['id']
-                print(f"➡️  Found Target Workspace: '{target_ws['name']}' ({WORKSPACE_ID})")
-            else:
-                print(f"⚠️  Workspace '{TARGET_WORKSPACE_NAME}' not found. Available workspaces:")
-                for ws in workspaces:
-                    print(f"     - {ws['name']} ({ws['id']})")
-                print("\n❌ Please update TARGET_WORKSPACE_NAME or TARGET_WORKSPACE_ID in the script.")
-                sys.exit(1)
-        else:
-            # Auto-select first workspace
-            target_ws = workspaces[0]
-            WORKSPACE_ID = target_ws['id']
-            print(f"➡️  Auto-selected Workspace: '{target_ws['name']}' ({WORKSPACE_ID})")
-            
     except Exception as e:
         print(f"❌ Error fetching workspaces: {e}")
         sys.exit(1)
 
+    if not workspaces:
+        print("❌ No Workspaces found. Please create one in Postman.")
+        sys.exit(1)
+
+    # Search by name if configured
+    if TARGET_WORKSPACE_NAME:
+        target_ws = next((ws for ws in workspaces if TARGET_WORKSPACE_NAME.lower() in ws['name'].lower()), None)
+        if target_ws:
+            print(f"➡️  Found Target Workspace: '{target_ws['name']}' ({target_ws['id']})")
+            return target_ws['id']
+        print(f"⚠️  Workspace '{TARGET_WORKSPACE_NAME}' not found. Available workspaces:")
+        for ws in workspaces:
+            print(f"     - {ws['name']} ({ws['id']})")
+        print("\n❌ Please update TARGET_WORKSPACE_NAME or TARGET_WORKSPACE_ID in the script.")
+        sys.exit(1)
+
+    # Auto-select first workspace
+    target_ws = workspaces[0]
+    print(f"➡️  Auto-selected Workspace: '{target_ws['name']}' ({target_ws['id']})")
+    return target_ws['id']
+
 
 # =============================================================================
 # BLOCK A: THE READER (Scalability)
@@ -99,246 +191,141 @@ else:
 # Business Value: Decouples the script from hardcoded values. Allows this engine
 # to process ANY of the 47 Specs in the future without code changes.
 
-print("\n📖 BLOCK A: Reading and Parsing Spec...")
-
-# [SCALABILITY PATTERN]: In a real production environment, this block would 
+# [SCALABILITY PATTERN]: In a real production environment, this block would
 # fetch the latest spec directly from your Infrastructure (AWS/Azure/GitHub).
 # Example (Conceptual):
-# 
+#
 # import boto3
 # s3 = boto3.client('s3')
 # obj = s3.get_object(Bucket='payment-specs', Key='refund-api.yaml')
 # spec_content_raw = obj['Body'].read().decode('utf-8')
 # print("   ✅ Fetched latest spec from AWS S3")
 
-if not os.path.exists(SPEC_FILE):
-    print(f"❌ ERROR: Spec file '{SPEC_FILE}' not found.")
-    sys.exit(1)
+def read_spec(spec_file):
+    if not os.path.exists(spec_file):
+        raise IngestError(f"Spec file '{spec_file}' not found.")
 
-with open(SPEC_FILE, 'r') as f:
-    spec_content_raw = f.read()
+    with open(spec_file, 'r', encoding='utf-8') as f:
+        spec_content_raw = f.read()
     try:
         spec_data = yaml.safe_load(spec_content_raw)
     except yaml.YAMLError as exc:
-        print(f"❌ Error parsing YAML: {exc}")
-        sys.exit(1)
-
-spec_name = spec_data.get('info', {}).get('title', 'Imported API')
-spec_version = spec_data.get('info', {}).get('version', '1.0.0')
-servers = spec_data.get('servers', [])
-
-# Dynamic Parsing of Environments
-# Logic maps 'description' keywords to environment keys
-env_urls = {}
-for server in servers:
-    url = server.get('url')
-    desc = server.get('description', '').lower()
-    
-    if 'production' in desc:
-        env_urls['production'] = url
-    elif 'uat' in desc:
-        env_urls['uat'] = url
-    elif 'qa' in desc:
-        env_urls['qa'] = url
-    elif 'dev' in desc:
-        env_urls['development'] = url
-
-print(f"   ✅ Loaded Spec: {spec_name} (v{spec_version})")
-print(f"   ✅ Extracted {len(env_urls)} Environments: {', '.join(env_urls.keys())}")
+        raise IngestError(f"Error parsing YAML in '{spec_file}': {exc}")
+    if not isinstance(spec_data, dict):
+        # Empty files parse to None, stray text to a string, a top-level list to a list
+        raise IngestError(f"'{spec_file}' is not an OpenAPI document "
+                          f"(expected a mapping at the top level, got {type(spec_data).__name__})")
+
+    spec_name = spec_data.get('info', {}).get('title', 'Imported API')
+    spec_version = spec_data.get('info', {}).get('version', '1.0.0')
+    servers = spec_data.get('servers', [])
+
+    # Dynamic Parsing of Environments
+    # Logic maps 'description' keywords to environment keys
+    env_urls = {}
+    for server in servers:
+        url = server.get('url')
+        desc = server.get('description', '').lower()
+
+        if 'production' in desc:
+            env_urls['production'] = url
+        elif 'uat' in desc:
+            env_urls['uat'] = url
+        elif 'qa' in desc:
+            env_urls['qa'] = url
+        elif 'dev' in desc:
+            env_urls['development'] = url
+
+    return {
+        "file": spec_file,
+        "raw": spec_content_raw,
+        "data": spec_data,
+        "name": spec_name,
+        "version": spec_version,
+        "env_urls": env_urls,
+    }
 
 
 # =============================================================================
 # BLOCK B: THE ARCHITECT (Governance)
 # =============================================================================
-# Business Value: Enforces "Spec-First" design. The API Builder becomes the 
+# Business Value: Enforces "Spec-First" design. The API Builder becomes the
 # Single Source of Truth, preventing "drift" between Code and Documentation.
 #
 # NOTE: Upgraded from legacy '/specs' to modern '/apis' endpoint for stability.
 # This is the current Postman best practice and ensures production reliability.
 
-print("\n🏛️  BLOCK B: Creating API in Postman API Builder...")
-
-# Step 1: Check if API already exists
-existing_api_id = None
-try:
-    apis_resp = requests.get(f"{BASE_URL}/apis?workspace={WORKSPACE_ID}", headers=headers)
-    if apis_resp.status_code == 200:
-        for api in apis_resp.json().get('apis', []):
-            if api.get('name') == spec_name:
-                existing_api_id = api.get('id')
-                print(f"   ℹ️  API '{spec_name}' already exists ({existing_api_id}). Using it.")
-                break
-except Exception as e:
-    print(f"   ⚠️  Could not check existing APIs: {e}")
-
-# Step 2: Create API if it doesn't exist
-api_id = existing_api_id
-if not api_id:
-    print(f"   ℹ️  Creating new API '{spec_name}'...")
-    api_payload = {
+def build_api_payload(spec):
+    return {
         "api": {
-            "name": spec_name,
-            "summary": f"Automated ingestion of {spec_name}",
-            "description": spec_data.get('info', {}).get('description', ''),
+            "name": spec['name'],
+            "summary": f"Automated ingestion of {spec['name']}",
+            "description": spec['data'].get('info', {}).get('description', ''),
+        },
+        "version": {
+            "name": spec['version']
         }
     }
-    
-    api_resp = requests.post(f"{BASE_URL}/apis?workspace={WORKSPACE_ID}", headers=headers, json=api_payload)
-    if api_resp.status_code not in [200, 201]:
-        print(f"❌ Failed to create API: {api_resp.status_code}")
-        print(f"   Response: {api_resp.text}")
-        sys.exit(1)
-    
-    api_id = api_resp.json()['api']['id']
-    print(f"   ✅ API Created: {api_id}")
-
-# Step 3: Create Version
-print(f"   ℹ️  Creating version '{spec_version}'...")
-version_payload = {
-    "version": {
-        "name": spec_version
-    }
-}
-
-version_resp = requests.post(f"{BASE_URL}/apis/{api_id}/versions", headers=headers, json=version_payload)
-if version_resp.status_code not in [200, 201]:
-    # Version might already exist, try to get it
-    versions_resp = requests.get(f"{BASE_URL}/apis/{api_id}/versions", headers=headers)
-    if versions_resp.status_code == 200:
-        versions = versions_resp.json().get('versions', [])
-        version_id = versions[0]['id'] if versions else None
-        if version_id:
-            print(f"   ℹ️  Using existing version: {version_id}")
-        else:
-            print(f"❌ Failed to create/find version")
-            sys.exit(1)
-    else:
-        print(f"❌ Failed to create version: {version_resp.text}")
-        sys.exit(1)
-else:
-    version_id = version_resp.json()['version']['id']
-    print(f"   ✅ Version Created: {version_id}")
-
-# Step 4: Import Schema using the Import API (more robust for large files)
-print(f"   ℹ️  Importing OpenAPI schema via Import API...")
-
-# First, let's use the simpler collection import approach
-# The Import API can handle the OpenAPI spec and create both API + Collection
-import_payload = {
-    "type": "string",
-    "input": spec_content_raw
-}
-
-import_resp = requests.post(f"{BASE_URL}/import/openapi?workspace={WORKSPACE_ID}", headers=headers, json=import_payload)
-if import_resp.status_code not in [200, 201]:
-    print(f"❌ Failed to import OpenAPI: {import_resp.status_code}")
-    print(f"   Response: {import_resp.text}")
-    sys.exit(1)
-
-import_result = import_resp.json()
-print(f"   ✅ OpenAPI Imported Successfully")
-
-# Extract the created resources
-collections = import_result.get('collections', [])
-if collections:
-    collection_id = collections[0].get('id') or collections[0].get('uid')
-    print(f"   ✅ Collection Created: {collection_id}")
-else:
-    print(f"   ⚠️  No collection generated from import")
-    # Fallback: manually create collection
-    collection_id = None
 
 
 # =============================================================================
 # BLOCK C: THE BUILDER (Automation)
 # =============================================================================
-# Business Value: Eliminates manual errors. The Import API generates the 
-# collection directly from the OpenAPI specification.
+# Business Value: Eliminates manual errors. The collection is generated locally
+# from the OpenAPI specification (openapi_to_collection.py), so it can be built,
+# cached and reviewed without touching Postman.
 #
 # GOVERNANCE NOTE:
-# The Import API creates a fresh collection based on the spec.
-# In a mature Governance model, we would use Postman's Git Integration or 
-# "Merge" strategy to preserve manual tests added by developers.
-
-print("\n🏗️  BLOCK C: Collection Ready from Import...")
-
-# The Import API already created the collection in Step 4
-if not collection_id:
-    print("   ⚠️  Attempting manual collection creation as fallback...")
-    # Manual fallback if needed
-    collection_payload = {
-        "collection": {
-            "info": {
-                "name": f"{spec_name} - Collection",
-                "description": spec_data.get('info', {}).get('description', ''),
-                "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
-            }
-        }
-    }
-    
-    coll_resp = requests.post(f"{BASE_URL}/collections?workspace={WORKSPACE_ID}", headers=headers, json=collection_payload)
-    if coll_resp.status_code in [200,201]:
-        collection_id = coll_resp.json()['collection']['id']
-        print(f"   ✅ Fallback Collection Created: {collection_id}")
-    else:
-        print(f"   ❌ Could not create collection")
-        sys.exit(1)
-else:
-    print(f"   ✅ Using Collection: {collection_id}")
+# On re-publish, the apply stage three-way merges the new collection
+# (base = last published artifact, theirs = live collection, ours = new build)
+# into the existing collection, so manual tests added by developers survive.
+# See collection_merge.py.
+
+def build_collection(spec):
+    collection = convert(spec['data'], name=spec['name'])
+
+    # Contract tests: status codes + response schemas as pm.test per request,
+    # so the "Green Checkmark" means the response matches the spec.
+    add_contract_tests(collection, spec['data'])
+    return collection
 
 
 # =============================================================================
 # BLOCK D: THE CONFIGURATOR (Usability)
 # =============================================================================
-# Business Value: Environment Switcher logic (Dev -> QA -> Prod). 
+# Business Value: Environment Switcher logic (Dev -> QA -> Prod).
 # Reduces configuration time from 15 mins to 0 mins.
 
-print("\n⚙️  BLOCK D: constructing Environment...")
-
-# Create the Env Values list
-env_values = []
-
-# 1. Base URLs
-# We set a default 'baseUrl' to the Development URL for immediate safety.
-# We also store specific variables for reference.
-dev_url = env_urls.get('development', 'https://example.com')
-env_values.append({"key": "baseUrl", "value": dev_url, "enabled": True})
-
-for key, url in env_urls.items():
-    env_values.append({"key": f"url_{key}", "value": url, "enabled": True})
-
-# 2. Auth Placeholders
-# We inject these so the Mock Script knows where to look.
-env_values.extend([
-    {"key": "client_id", "value": "demo_client_id_123", "enabled": True},     # Pre-filled for demo
-    {"key": "client_secret", "value": "demo_secret", "enabled": True},        # Pre-filled for demo
-    {"key": "token_url", "value": "https://auth.example.com/token", "enabled": True}, 
-    {"key": "jwt_token", "value": "", "enabled": True} # Dynamic variable
-])
-
-env_payload = {
-    "environment": {
-        "name": f"{spec_name} - Environment",
-        "values": env_values
+def build_environment_payload(spec):
+    env_urls = spec['env_urls']
+
+    # Create the Env Values list
+    env_values = []
+
+    # 1. Base URLs
+    # We set a default 'baseUrl' to the Development URL for immediate safety.
+    # We also store specific variables for reference.
+    dev_url = env_urls.get('development', 'https://example.com')
+    env_values.append({"key": "baseUrl", "value": dev_url, "enabled": True})
+
+    for key, url in env_urls.items():
+        env_values.append({"key": f"url_{key}", "value": url, "enabled": True})
+
+    # 2. Auth Placeholders
+    # We inject these so the Mock Script knows where to look.
+    env_values.extend([
+        {"key": "client_id", "value": "demo_client_id_123", "enabled": True},     # Pre-filled for demo
+        {"key": "client_secret", "value": "demo_secret", "enabled": True},        # Pre-filled for demo
+        {"key": "token_url", "value": "https://auth.example.com/token", "enabled": True},
+        {"key": "jwt_token", "value": "", "enabled": True} # Dynamic variable
+    ])
+
+    return {
+        "environment": {
+            "name": f"{spec['name']} - Environment",
+            "values": env_values
+        }
     }
-}
-
-env_resp = requests.post(f"{BASE_URL}/environments?workspace={WORKSPACE_ID}", headers=headers, json=env_payload)
-
-# DEBUG: Show what happened
-print(f"   🐛 DEBUG: Environment creation status: {env_resp.status_code}")
-
-if env_resp.status_code not in [200, 201]:
-    print(f"❌ Failed to create environment: {env_resp.status_code}")
-    print(f"   Response: {env_resp.text}")
-    print(f"   Payload had {len(env_values)} variables")
-    # Soft fail - we can continue
-else:
-    env_id = env_resp.json()['environment']['id']
-    env_name = env_resp.json()['environment']['name']
-    print(f"   ✅ Environment Created: {env_id}")
-    print(f"   ✅ Environment Name: '{env_name}'")
-    print(f"   ✅ Variables: {len(env_values)} configured")
 
 
 # =============================================================================
@@ -347,44 +334,514 @@ else:
 # Business Value: "Batteries Included". We inject the Mock Auth logic directly
 # into the Collection so it works immediately upon download. No coding required.
 
-print("\n💉 BLOCK E: Injecting Mock Auth Logic...")
+def inject_mock_auth(collection):
+    if not os.path.exists(MOCK_SCRIPT_FILE):
+        print(f"   ⚠️  Mock script '{MOCK_SCRIPT_FILE}' not found. Skipping injection.")
+        return collection
 
-if os.path.exists(MOCK_SCRIPT_FILE):
     with open(MOCK_SCRIPT_FILE, 'r', encoding='utf-8') as f:
         mock_script_content = f.read()
 
-    # 1. Fetch the Generated Collection JSON
-    get_col_resp = requests.get(f"{BASE_URL}/collections/{collection_id}", headers=headers)
-    if get_col_resp.status_code == 200:
-        col_data = get_col_resp.json()
-        
-        # 2. Add Pre-request Script to the Collection Root
-        # This ensures it runs for EVERY request in the collection.
-        event = {
-            "listen": "prerequest",
-            "script": {
-                "type": "text/javascript",
-                "exec": mock_script_content.splitlines()
-            }
+    # Add Pre-request Script to the Collection Root
+    # This ensures it runs for EVERY request in the collection.
+    event = {
+        "listen": "prerequest",
+        "script": {
+            "type": "text/javascript",
+            "exec": mock_script_content.splitlines()
         }
-        
-        if 'event' not in col_data['collection']:
-            col_data['collection']['event'] = []
-            
-        col_data['collection']['event'].append(event)
-        
-        # 3. Update the Collection
-        put_col_resp = requests.put(f"{BASE_URL}/collections/{collection_id}", headers=headers, json=col_data)
-        if put_col_resp.status_code == 200:
-            print("   ✅ Mock Script Injected successfully.")
+    }
+    collection.setdefault('event', []).append(event)
+    return collection
+
+
+# =============================================================================
+# BUILD STAGE (offline)
+# =============================================================================
+
+def _build_collection_artifact(artifact_dir, spec):
+    """Blocks C + E for one (sub-)spec. Returns the collection's object hash."""
+    store = ArtifactStore(artifact_dir)
+    with PROFILER.block("C: build collection"):
+        collection = build_collection(spec)
+    with PROFILER.block("E: inject mock auth"):
+        collection = inject_mock_auth(collection)
+    if COMPACT_COLLECTIONS:
+        with PROFILER.block("E: compact collection"):
+            collection, report = compact_collection(collection, COMPACTION_POLICY)
+        print(f"   🗜️  {collection['info'].get('name')}: {report.summary()}")
+    with PROFILER.block("store: serialize + hash"):
+        return store.put(collection)
+
+
+def build_spec(spec_file, artifact_dir=ARTIFACT_DIR, shard_by=None, executor=None):
+    """
+    Blocks A-E for one spec, written to the artifact store. No network.
+
+    With `shard_by` ('tag' or 'path') the spec produces one collection per
+    shard (see sharding.py); `executor` builds those shards in parallel.
+    """
+    store = ArtifactStore(artifact_dir)
+    with PROFILER.spec(os.path.basename(spec_file)):
+        with PROFILER.block("A: read spec"):
+            spec = read_spec(spec_file)
+        _check_slug_owner(store, spec_slug(spec['name']), spec_file, spec['name'])
+        with PROFILER.block("B: api payload"):
+            api_payload = build_api_payload(spec)
+        with PROFILER.block("D: environment payload"):
+            env_payload = build_environment_payload(spec)
+
+        artifacts = {
+            "api": store.put(api_payload),
+            "environment": store.put(env_payload),
+        }
+        if shard_by:
+            # Sub-specs only need 'data' and 'name' (the raw text would be pickled per shard)
+            sub_specs = {name: dict(spec, data=sub_spec, name=sub_spec['info']['title'], raw=None)
+                         for name, sub_spec in shard_spec(spec['data'], shard_by).items()}
+            if executor:
+                futures = {name: executor.submit(_build_collection_artifact, artifact_dir, sub)
+                           for name, sub in sub_specs.items()}
+                artifacts["shards"] = {name: future.result() for name, future in futures.items()}
+            else:
+                artifacts["shards"] = {name: _build_collection_artifact(artifact_dir, sub)
+                                       for name, sub in sub_specs.items()}
         else:
-            print(f"   ⚠️  Failed to update collection with script: {put_col_resp.text}")
-            
+            artifacts["collection"] = _build_collection_artifact(artifact_dir, spec)
+
+        manifest = {
+            "spec_file": spec_file,
+            "slug": spec_slug(spec['name']),
+            "name": spec['name'],
+            "version": spec['version'],
+            "shard_by": shard_by,
+            "operations": operation_index(spec['data']),
+            "artifacts": artifacts,
+        }
+        store.write_manifest(manifest['slug'], manifest)
+    return manifest
+
+
+def expand_spec_args(patterns):
+    files = []
+    for pattern in patterns or [SPEC_FILE]:
+        matches = sorted(glob.glob(pattern))
+        files.extend(matches if matches else [pattern])
+    return files
+
+
+def build_all(spec_files, artifact_dir=ARTIFACT_DIR, jobs=None, shard_by=None):
+    print(f"\n📦 BUILD: {len(spec_files)} spec(s) -> {artifact_dir}"
+          + (f" (sharded by {shard_by})" if shard_by else ""))
+
+    def collect(spec_file, build):
+        try:
+            return spec_file, build(), None
+        except IngestError as e:
+            return spec_file, None, e
+        except Exception as e:
+            # Anything else is a bug or an unexpected spec shape: report it, keep building the rest
+            return spec_file, None, f"{type(e).__name__}: {e}"
+
+    if jobs == 1 or (len(spec_files) == 1 and not shard_by):
+        results = [collect(f, lambda f=f: build_spec(f, artifact_dir, shard_by)) for f in spec_files]
+    elif len(spec_files) == 1:
+        # One big spec: spread its shards across cores instead
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = [collect(spec_files[0], lambda: build_spec(spec_files[0], artifact_dir, shard_by, pool))]
     else:
-        print(f"   ⚠️  Could not fetch collection for injection: {get_col_resp.text}")
+        # Builds are pure CPU + local disk, so they spread freely across cores
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [(f, pool.submit(build_spec, f, artifact_dir, shard_by)) for f in spec_files]
+            results = [collect(f, future.result) for f, future in futures]
+
+    # Specs built in parallel in this run never see each other's manifest: check the batch too
+    store = ArtifactStore(artifact_dir)
+    owners = {}
+    for index, (spec_file, manifest, error) in enumerate(results):
+        if error:
+            continue
+        if manifest['slug'] in owners:
+            first = results[owners[manifest['slug']]]
+            results[index] = (spec_file, None, f"'{spec_file}' and '{first[0]}' both have the title "
+                                               f"'{manifest['name']}'; give one of them a distinct info.title")
+            store.write_manifest(manifest['slug'], first[1])     # the later build overwrote it
+        else:
+            owners[manifest['slug']] = index
+
+    manifests = []
+    failures = 0
+    for spec_file, manifest, error in results:
+        if error:
+            failures += 1
+            print(f"   ❌ {spec_file}: {error}")
+        else:
+            manifests.append(manifest)
+            artifacts = manifest['artifacts']
+            built = (f"{len(artifacts['shards'])} shard collections" if 'shards' in artifacts
+                     else f"collection={artifacts['collection'][:12]}")
+            print(f"   ✅ {manifest['name']} (v{manifest['version']}) {built}")
+    return manifests, failures
+
+
+# =============================================================================
+# APPLY STAGE (network)
+# =============================================================================
+
+def _send_collection(method, url, headers, store, digest):
+    """Upload a collection artifact without loading it into memory."""
+    with tempfile.TemporaryFile() as body:
+        body.write(b'{"collection":')
+        with open(store.object_path(digest), 'rb') as src:
+            shutil.copyfileobj(src, body)
+        body.write(b'}')
+        return api_request(method, url, headers, data=body)
+
+
+def apply_api(manifest, record, store, headers, workspace_id, out=None):
+    digest = manifest['artifacts']['api']
+    if record.get('api', {}).get('hash') == digest:
+        print("   ⏭️  API unchanged", file=out)
+        return
+    payload = store.load(digest)
+    spec_name = payload['api']['name']
+
+    # Step 1: Reuse the API we published before, or find it by name
+    api_id = record.get('api', {}).get('id')
+    if not api_id:
+        try:
+            apis_resp = api_request('GET', f"{BASE_URL}/apis?workspace={workspace_id}", headers)
+            if apis_resp.status_code == 200:
+                for api in apis_resp.json().get('apis', []):
+                    if api.get('name') == spec_name:
+                        api_id = api.get('id')
+                        print(f"   ℹ️  API '{spec_name}' already exists ({api_id}). Using it.", file=out)
+                        break
+        except Exception as e:
+            print(f"   ⚠️  Could not check existing APIs: {e}", file=out)
+
+    # Step 2: Create API if it doesn't exist
+    if not api_id:
+        print(f"   ℹ️  Creating new API '{spec_name}'...", file=out)
+        api_resp = api_request('POST', f"{BASE_URL}/apis?workspace={workspace_id}", headers,
+                               json={"api": payload['api']})
+        if api_resp.status_code not in [200, 201]:
+            raise IngestError(f"Failed to create API: {api_resp.status_code} {api_resp.text}")
+        api_id = api_resp.json()['api']['id']
+        print(f"   ✅ API Created: {api_id}", file=out)
+
+    # Step 3: Create Version
+    version_name = payload['version']['name']
+    print(f"   ℹ️  Creating version '{version_name}'...", file=out)
+    version_resp = api_request('POST', f"{BASE_URL}/apis/{api_id}/versions", headers,
+                               json={"version": payload['version']})
+    if version_resp.status_code in [200, 201]:
+        version_id = version_resp.json()['version']['id']
+        print(f"   ✅ Version Created: {version_id}", file=out)
+    else:
+        # Version might already exist, try to get it
+        versions_resp = api_request('GET', f"{BASE_URL}/apis/{api_id}/versions", headers)
+        versions = versions_resp.json().get('versions', []) if versions_resp.status_code == 200 else []
+        version_id = next((v['id'] for v in versions if v.get('name') == version_name),
+                          versions[0]['id'] if versions else None)
+        if not version_id:
+            raise IngestError(f"Failed to create/find version: {version_resp.text}")
+        print(f"   ℹ️  Using existing version: {version_id}", file=out)
+
+    record['api'] = {"hash": digest, "id": api_id, "version_id": version_id}
+
+
+def _publish_collection(label, digest, previous, op_index, store, headers, workspace_id, out=None):
+    """Create one collection artifact, or three-way merge it into the live one. Returns its record."""
+    collection_id = previous.get('id')
+    if collection_id and store.has(previous.get('hash')):
+        # Three-way merge into the live collection (preserves manual tests).
+        # The live body is merged as it streams in and the result is streamed
+        # back out from a temp file, so no collection is held as dicts.
+        with tempfile.TemporaryFile() as body:
+            with api_request('GET', f"{BASE_URL}/collections/{collection_id}", headers, stream=True) as live_resp:
+                if live_resp.status_code == 200:
+                    with open(store.object_path(previous['hash']), 'rb') as base_fp, \
+                            open(store.object_path(digest), 'rb') as ours_fp:
+                        report = merge_files(base_fp, live_resp.iter_content(CHUNK_SIZE), ours_fp, body,
+                                             op_index=op_index)
+            if live_resp.status_code == 200:
+                print(f"   ✅ {label} merged with live collection: {report.summary()}", file=out)
+                for conflict in report.conflicts:
+                    print(f"   ⚠️  {label} conflict (spec wins): {conflict}", file=out)
+
+                # Single PUT of the merged result
+                put_resp = api_request('PUT', f"{BASE_URL}/collections/{collection_id}", headers, data=body)
+                if put_resp.status_code != 200:
+                    raise IngestError(f"Failed to update {label.lower()}: {put_resp.text}")
+                print(f"   ✅ {label} Updated: {collection_id}", file=out)
+                return {"hash": digest, "id": collection_id}
+        print(f"   ⚠️  Live collection {collection_id} not reachable ({live_resp.status_code}). "
+              f"Publishing a fresh {label.lower()} instead.", file=out)
+
+    coll_resp = _send_collection('POST', f"{BASE_URL}/collections?workspace={workspace_id}", headers, store, digest)
+    if coll_resp.status_code not in [200, 201]:
+        raise IngestError(f"Could not create {label.lower()}: {coll_resp.status_code} {coll_resp.text}")
+    collection_id = coll_resp.json()['collection']['id']
+    print(f"   ✅ {label} Created (Mock Auth pre-installed): {collection_id}", file=out)
+    return {"hash": digest, "id": collection_id}
+
+
+def apply_collection(manifest, record, store, headers, workspace_id, out=None):
+    artifacts = manifest['artifacts']
+    op_index = manifest.get('operations')
+
+    if 'shards' not in artifacts:
+        digest = artifacts['collection']
+        previous = record.get('collection', {})
+        if previous.get('hash') == digest:
+            print("   ⏭️  Collection unchanged", file=out)
+            return
+        record['collection'] = _publish_collection("Collection", digest, previous, op_index,
+                                                   store, headers, workspace_id, out)
+        return
+
+    # Sharded: publish only the shards whose content changed, concurrently
+    published_shards = record.setdefault('shards', {})
+    changed = {name: digest for name, digest in artifacts['shards'].items()
+               if published_shards.get(name, {}).get('hash') != digest}
+    print(f"   ℹ️  {len(artifacts['shards'])} shards, {len(changed)} changed", file=out)
+    for name, entry in published_shards.items():
+        if name not in artifacts['shards']:
+            print(f"   ⚠️  Shard '{name}' is no longer in the spec; collection {entry.get('id')} left in place",
+                  file=out)
+    if not changed:
+        return
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(changed))) as pool:
+        futures = {name: pool.submit(_publish_collection, f"Shard '{name}'", digest,
+                                     published_shards.get(name, {}), op_index, store, headers, workspace_id, out)
+                   for name, digest in changed.items()}
+        for name, future in futures.items():
+            try:
+                published_shards[name] = future.result()
+            except (IngestError, requests.RequestException) as e:
+                errors.append(f"shard '{name}': {e}")
+            except Exception as e:
+                errors.append(f"shard '{name}': {e.__class__.__name__}: {e}")
+    if errors:
+        # Successful shards are already recorded; a re-run retries only the failed ones
+        raise IngestError('; '.join(errors))
+
+
+def apply_environment(manifest, record, store, headers, workspace_id, out=None):
+    digest = manifest['artifacts']['environment']
+    previous = record.get('environment', {})
+    if previous.get('hash') == digest:
+        print("   ⏭️  Environment unchanged", file=out)
+        return
+    env_payload = store.load(digest)
+
+    env_resp = None
+    if previous.get('id'):
+        env_resp = api_request('PUT', f"{BASE_URL}/environments/{previous['id']}", headers, json=env_payload)
+        if env_resp.status_code == 404:
+            env_resp = None       # deleted in Postman: recreate below
+    if env_resp is None:
+        env_resp = api_request('POST', f"{BASE_URL}/environments?workspace={workspace_id}", headers,
+                               json=env_payload)
+
+    if env_resp.status_code not in [200, 201]:
+        print(f"   ⚠️  Failed to publish environment: {env_resp.status_code}", file=out)
+        print(f"   Response: {env_resp.text}", file=out)
+        print(f"   Payload had {len(env_payload['environment']['values'])} variables", file=out)
+        # Soft fail - we can continue (and retry on the next apply)
+        return
+
+    env_id = env_resp.json()['environment']['id']
+    print(f"   ✅ Environment Published: {env_id} "
+          f"('{env_payload['environment']['name']}', {len(env_payload['environment']['values'])} variables)",
+          file=out)
+    record['environment'] = {"hash": digest, "id": env_id}
+
+
+def apply_manifest(manifest, store, published, headers, workspace_id, out=None):
+    """Publish one spec's artifacts. `published` is updated in place; progress is printed to `out`."""
+    print(f"\n🚚 APPLY: {manifest['name']} (v{manifest['version']})", file=out)
+    record = published.setdefault(workspace_id, {}).setdefault(manifest['slug'], {})
+
+    with PROFILER.spec(os.path.basename(manifest['spec_file'])):
+        print("🏛️  BLOCK B: API Builder...", file=out)
+        with PROFILER.block("B: apply api"):
+            apply_api(manifest, record, store, headers, workspace_id, out)
+        print("🏗️  BLOCK C/E: Collection (with Mock Auth)...", file=out)
+        with PROFILER.block("C/E: apply collection"):
+            apply_collection(manifest, record, store, headers, workspace_id, out)
+        print("⚙️  BLOCK D: Environment...", file=out)
+        with PROFILER.block("D: apply environment"):
+            apply_environment(manifest, record, store, headers, workspace_id, out)
+    return record
+
+
+def apply_and_record(manifest, store, headers, workspace_id, out=None):
+    """Apply one manifest and record what was published, even on failure. Returns None or the error."""
+    published = store.load_published()
+    try:
+        record = apply_manifest(manifest, store, published, headers, workspace_id, out)
+        error = None
+    except (IngestError, requests.RequestException) as e:
+        record = published[workspace_id][manifest['slug']]
+        error = str(e)
+        print(f"   ❌ {e}", file=out)
+    except Exception as e:
+        # Unexpected response shape, unreadable collection...: fail this spec, keep applying the rest
+        record = published[workspace_id][manifest['slug']]
+        error = f"{e.__class__.__name__}: {e}"
+        print(f"   ❌ {error}", file=out)
+    # Record progress after every spec so a re-run resumes where this one stopped
+    store.update_published(workspace_id, manifest['slug'], record)
+    return error
+
+
+def apply_all(headers, workspace_id, artifact_dir=ARTIFACT_DIR, slugs=None):
+    store = ArtifactStore(artifact_dir)
+    manifests = [m for m in store.manifests() if slugs is None or m['slug'] in slugs]
+    if not manifests:
+        print(f"⚠️  No build artifacts in '{artifact_dir}'. Run 'python ingest_api.py build' first.")
+        return 1
+
+    failures = 0
+    for manifest in manifests:
+        if apply_and_record(manifest, store, headers, workspace_id):
+            failures += 1
+    return failures
+
+
+# =============================================================================
+# FAN-OUT: one build, many workspaces
+# =============================================================================
+
+def resolve_workspace_targets(headers, patterns):
+    """Workspace IDs or case-insensitive name globs ('Team *') -> [(id, name)] in listing order."""
+    resp = api_request('GET', f"{BASE_URL}/workspaces", headers)
+    if resp.status_code != 200:
+        raise IngestError(f"Could not list workspaces: {resp.status_code} {resp.text}")
+    workspaces = resp.json().get('workspaces', [])
+
+    targets = {}
+    for pattern in patterns:
+        matches = [ws for ws in workspaces
+                   if ws['id'] == pattern or fnmatch.fnmatchcase(ws['name'].lower(), pattern.lower())]
+        if not matches:
+            print(f"⚠️  '{pattern}' matched no workspace")
+        for ws in matches:
+            targets[ws['id']] = ws['name']
+    return list(targets.items())
+
+
+def _apply_workspace(manifests, store, headers, workspace_id):
+    """Apply every manifest to one workspace. Returns ([(name, status, error)], log text)."""
+    # Progress goes to this workspace's own buffer (shard upload threads included), printed as one block
+    out = io.StringIO()
+    results = []
+    for manifest in manifests:
+        before = store.load_published().get(workspace_id, {}).get(manifest['slug'])
+        error = apply_and_record(manifest, store, headers, workspace_id, out)
+        after = store.load_published().get(workspace_id, {}).get(manifest['slug'])
+        if error:
+            status = "failed"
+        elif not before:
+            status = "created"
+        else:
+            status = "unchanged" if before == after else "updated"
+        results.append((manifest['name'], status, error))
+    return results, out.getvalue()
+
+
+def apply_fanout(headers, targets, artifact_dir=ARTIFACT_DIR, slugs=None, workers=FANOUT_WORKERS):
+    """Publish the same build artifacts to every target workspace concurrently."""
+    store = ArtifactStore(artifact_dir)
+    manifests = [m for m in store.manifests() if slugs is None or m['slug'] in slugs]
+    if not manifests:
+        print(f"⚠️  No build artifacts in '{artifact_dir}'. Run 'python ingest_api.py build' first.")
+        return 1
+    print(f"\n📣 FAN-OUT: {len(manifests)} spec(s) -> {len(targets)} workspace(s), {workers} at a time")
+
+    # Each workspace's log is printed as one block when it finishes, not interleaved
+    started = time.perf_counter()
+    report = {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as pool:
+        futures = {pool.submit(_apply_workspace, manifests, store, headers, ws_id): (ws_id, name)
+                   for ws_id, name in targets}
+        for future in as_completed(futures):
+            ws_id, name = futures[future]
+            try:
+                results, log = future.result()
+            except Exception as e:     # one workspace must not take the report down with it
+                results, log = [(m['name'], "failed", str(e)) for m in manifests], ""
+            report[ws_id] = results
+            print(f"\n===== {name} ({ws_id}) =====\n{log}", end='')
+
+    failures = 0
+    print(f"\n📊 FAN-OUT REPORT ({time.perf_counter() - started:.1f}s)")
+    for ws_id, name in targets:
+        for spec_name, status, error in report[ws_id]:
+            failures += status == "failed"
+            icon = {"created": "🆕", "updated": "✅", "unchanged": "⏭️ ", "failed": "❌"}[status]
+            print(f"   {icon} {name[:30]:<30} {spec_name[:40]:<40} {status}" + (f": {error[:80]}" if error else ""))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Postman Adoption Starter Kit - Ingestion Engine")
+    parser.add_argument('command', nargs='?', choices=['run', 'build', 'apply'], default='run')
+    parser.add_argument('specs', nargs='*', help=f"spec files or glob patterns (default: {SPEC_FILE})")
+    parser.add_argument('--artifacts', default=ARTIFACT_DIR, help="artifact directory")
+    parser.add_argument('--jobs', type=int, default=None, help="parallel build processes (default: CPU count)")
+    parser.add_argument('--shard-by', choices=SHARD_STRATEGIES, default=None,
+                        help="split each spec into one collection per OpenAPI tag or top-level path segment")
+    parser.add_argument('--workspaces', default=TARGET_WORKSPACES, metavar='LIST',
+                        help="publish to several workspaces: comma-separated IDs or name globs, e.g. 'Team *,ws-123'")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, default=None, metavar='DIR',
+                        help=f"write CPU/memory profiles per block and spec (default dir: {PROFILE_DIR})")
+    args = parser.parse_args(argv)
+    if args.profile and args.workspaces and args.command != 'build':
+        # The profiler measures one thread; fan-out applies every workspace on its own thread
+        parser.error("--profile cannot be combined with --workspaces")
+
+    print("\n🚀 STARTING POSTMAN ADOPTION KIT ENGINE...\n")
+
+    if args.profile:
+        PROFILER.enable(args.profile)
+        # Worker processes would not report back to this profiler
+        args.jobs = 1
+        print(f"🔬 Profiling enabled (builds run serially) -> {args.profile}")
+
+    failures = 0
+    slugs = None
+    if args.command in ('run', 'build'):
+        manifests, failures = build_all(expand_spec_args(args.specs), args.artifacts, args.jobs, args.shard_by)
+        slugs = {m['slug'] for m in manifests}
+
+    if args.command in ('run', 'apply') and args.workspaces:
+        headers = load_headers()
+        targets = resolve_workspace_targets(headers, [p.strip() for p in args.workspaces.split(',') if p.strip()])
+        if not targets:
+            print("❌ No target workspaces matched.")
+            return 1
+        failures += apply_fanout(headers, targets, args.artifacts, slugs)
+        print("\n✨ DEPLOYMENT COMPLETE!" if not failures else f"\n⚠️  DEPLOYMENT FINISHED WITH {failures} FAILURE(S)")
+    elif args.command in ('run', 'apply'):
+        headers = load_headers()
+        workspace_id = resolve_workspace_id(headers)
+        failures += apply_all(headers, workspace_id, args.artifacts, slugs)
+        print("\n✨ DEPLOYMENT COMPLETE!" if not failures else f"\n⚠️  DEPLOYMENT FINISHED WITH {failures} FAILURE(S)")
+        print(f"   👉 Go to Workspace: https://go.postman.co/workspace/{workspace_id}")
+    else:
+        print("\n✨ BUILD COMPLETE!" if not failures else f"\n⚠️  BUILD FINISHED WITH {failures} FAILURE(S)")
+
+    report_dir = PROFILER.write_report()
+    if report_dir:
+        print(f"   🔬 Profile written to {report_dir}/ (summary.txt, memory.txt, stacks.collapsed)")
+
+    return 1 if failures else 0
 
-else:
-    print(f"   ⚠️  Mock script '{MOCK_SCRIPT_FILE}' not found. Skipping injection.")
 
-print("\n✨ DEPLOYMENT COMPLETE!")
-print(f"   👉 Go to Workspace: https://go.postman.co/workspace/{WORKSPACE_ID}")
+if __name__ == '__main__':
+    sys.exit(main())
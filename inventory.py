@@ -0,0 +1,407 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import ingest_api
+from artifact_store import content_hash
+from collection_merge import strip_volatile
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - WORKSPACE INVENTORY
+# =============================================================================
+#
+# ROLE: Keep a local, queryable picture of every workspace, collection,
+#       environment and API the key can see.
+#
+# WHY: Governance questions ("which environments are duplicated?", "what has
+#      nobody touched in a year?") used to mean listing and then fetching every
+#      entity one by one (tests/debug_environment.py): thousands of serial calls
+#      per question. Now one crawl fills .postman_inventory.db and every
+#      question is a local SQL query.
+#
+# HOW:
+#   - Listings are paginated and run for many workspaces in parallel (--workers).
+#   - Listings return `updatedAt`; the expensive detail fetch (full collection /
+#     environment) only happens when that timestamp moved since the last crawl.
+#   - Entities missing from a successful listing are pruned.
+#
+#   python inventory.py crawl                 # first run: everything; later: only changes
+#   python inventory.py find "refund"         # name lookup
+#   python inventory.py duplicates            # same name, or identical content
+#   python inventory.py zombies --stale-days 180
+# =============================================================================
+
+INVENTORY_FILE = os.getenv('POSTMAN_INVENTORY_FILE', '.postman_inventory.db')
+DEFAULT_WORKERS = 6          # stays well under Postman's per-key rate limit
+PAGE_SIZE = 100
+DEFAULT_STALE_DAYS = 180
+
+# Collection `info` fields that change with every save or copy. Left in, no two
+# copies of a collection would ever hash the same; `name` goes too so renamed
+# copies still count as identical content (same-name copies are a separate query).
+INFO_METADATA_KEYS = ('name', 'createdAt', 'updatedAt', 'lastUpdatedBy')
+
+# kind -> (list endpoint, response key, detail endpoint or None)
+ENTITY_KINDS = {
+    "collection": ("/collections", "collections", "/collections/{id}"),
+    "environment": ("/environments", "environments", "/environments/{id}"),
+    "api": ("/apis", "apis", None),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    id          TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    type        TEXT,
+    visibility  TEXT,
+    crawl_error TEXT,
+    last_seen   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    kind              TEXT NOT NULL,            -- collection | environment | api
+    id                TEXT NOT NULL,
+    workspace_id      TEXT NOT NULL,
+    name              TEXT NOT NULL,
+    uid               TEXT,
+    owner             TEXT,
+    created_at        TEXT,
+    updated_at        TEXT,
+    detail_updated_at TEXT,                     -- updated_at when the detail was last fetched
+    content_hash      TEXT,                     -- sha256 of the content without ids
+    item_count        INTEGER,                  -- requests / variables
+    last_seen         INTEGER NOT NULL,
+    PRIMARY KEY (kind, id, workspace_id)
+);
+CREATE INDEX IF NOT EXISTS entities_name ON entities (kind, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS entities_hash ON entities (kind, content_hash);
+CREATE INDEX IF NOT EXISTS entities_updated ON entities (updated_at);
+CREATE INDEX IF NOT EXISTS entities_workspace ON entities (workspace_id);
+CREATE TABLE IF NOT EXISTS crawls (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    api_calls   INTEGER,
+    details     INTEGER
+);
+"""
+
+
+def count_requests(items):
+    total = 0
+    for item in items or []:
+        if 'item' in item:
+            total += count_requests(item['item'])
+        elif 'request' in item:
+            total += 1
+    return total
+
+
+def summarize_detail(kind, payload):
+    """(content_hash, item_count) for a fetched collection or environment."""
+    if kind == "collection":
+        content = strip_volatile(payload)
+        content['info'] = {k: v for k, v in (content.get('info') or {}).items() if k not in INFO_METADATA_KEYS}
+        return content_hash(content), count_requests(payload.get('item'))
+    values = [{k: v.get(k) for k in ('key', 'value', 'type', 'enabled')} for v in payload.get('values', [])]
+    return content_hash(values), len(values)
+
+
+class Inventory:
+    """The SQLite store. Only touched from the crawler's main thread."""
+
+    def __init__(self, path=INVENTORY_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def start_crawl(self):
+        with self.conn:
+            return self.conn.execute("INSERT INTO crawls (started_at) VALUES (?)", (time.time(),)).lastrowid
+
+    def finish_crawl(self, crawl_id, api_calls, details):
+        with self.conn:
+            self.conn.execute("UPDATE crawls SET finished_at = ?, api_calls = ?, details = ? WHERE id = ?",
+                              (time.time(), api_calls, details, crawl_id))
+
+    def last_crawl(self):
+        return self.conn.execute("SELECT * FROM crawls WHERE finished_at IS NOT NULL ORDER BY id DESC LIMIT 1").fetchone()
+
+    def upsert_workspaces(self, workspaces, crawl_id):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO workspaces (id, name, type, visibility, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET name = excluded.name, type = excluded.type, "
+                "visibility = excluded.visibility, last_seen = excluded.last_seen",
+                [(ws['id'], ws.get('name', ''), ws.get('type'), ws.get('visibility'), crawl_id) for ws in workspaces])
+
+    def record_listing(self, workspace_id, listing, crawl_id):
+        """
+        Store one workspace's listing, prune what disappeared from it, and return
+        the (kind, id) pairs whose detail is missing or older than updatedAt.
+        """
+        stale = []
+        with self.conn:
+            self.conn.execute("UPDATE workspaces SET crawl_error = NULL WHERE id = ?", (workspace_id,))
+            for kind, entities in listing.items():
+                known = {row['id']: row['detail_updated_at'] for row in self.conn.execute(
+                    "SELECT id, detail_updated_at FROM entities WHERE kind = ? AND workspace_id = ?",
+                    (kind, workspace_id))}
+                self.conn.executemany(
+                    "INSERT INTO entities (kind, id, workspace_id, name, uid, owner, created_at, updated_at, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (kind, id, workspace_id) DO UPDATE SET name = excluded.name, uid = excluded.uid, "
+                    "owner = excluded.owner, created_at = excluded.created_at, updated_at = excluded.updated_at, "
+                    "last_seen = excluded.last_seen",
+                    [(kind, e['id'], workspace_id, e.get('name', ''), e.get('uid'), str(e.get('owner') or ''),
+                      e.get('createdAt'), e.get('updatedAt'), crawl_id) for e in entities])
+                if ENTITY_KINDS[kind][2]:
+                    stale.extend((kind, e['id']) for e in entities
+                                 if not e.get('updatedAt') or known.get(e['id']) != e['updatedAt'])
+                self.conn.execute("DELETE FROM entities WHERE kind = ? AND workspace_id = ? AND last_seen != ?",
+                                  (kind, workspace_id, crawl_id))
+        return stale
+
+    def record_error(self, workspace_id, error):
+        with self.conn:
+            self.conn.execute("UPDATE workspaces SET crawl_error = ? WHERE id = ?", (error, workspace_id))
+
+    def record_detail(self, kind, entity_id, updated_at, digest, item_count):
+        with self.conn:
+            self.conn.execute("UPDATE entities SET detail_updated_at = ?, content_hash = ?, item_count = ? "
+                              "WHERE kind = ? AND id = ?", (updated_at, digest, item_count, kind, entity_id))
+
+    def updated_at(self, kind, entity_id):
+        row = self.conn.execute("SELECT updated_at FROM entities WHERE kind = ? AND id = ?",
+                                (kind, entity_id)).fetchone()
+        return row['updated_at'] if row else None
+
+    def prune_workspaces(self, crawl_id):
+        """Drop workspaces (and their entities) that the full workspace list no longer returns."""
+        with self.conn:
+            self.conn.execute("DELETE FROM entities WHERE workspace_id IN "
+                              "(SELECT id FROM workspaces WHERE last_seen != ?)", (crawl_id,))
+            return self.conn.execute("DELETE FROM workspaces WHERE last_seen != ?", (crawl_id,)).rowcount
+
+    # --- local queries -------------------------------------------------------
+
+    def find(self, pattern, kind=None):
+        query = ("SELECT e.*, w.name AS workspace_name FROM entities e JOIN workspaces w ON w.id = e.workspace_id "
+                 "WHERE e.name LIKE ?")
+        params = [f"%{pattern}%"]
+        if kind:
+            query += " AND e.kind = ?"
+            params.append(kind)
+        return self.conn.execute(query + " ORDER BY e.kind, e.name COLLATE NOCASE", params).fetchall()
+
+    def duplicate_names(self):
+        return self.conn.execute(
+            "SELECT e.kind, e.name, COUNT(*) AS copies, GROUP_CONCAT(DISTINCT w.name) AS workspaces "
+            "FROM entities e JOIN workspaces w ON w.id = e.workspace_id "
+            "GROUP BY e.kind, e.name COLLATE NOCASE HAVING COUNT(*) > 1 ORDER BY copies DESC, e.kind, e.name"
+        ).fetchall()
+
+    def duplicate_contents(self):
+        return self.conn.execute(
+            "SELECT e.kind, e.content_hash, COUNT(*) AS copies, "
+            "GROUP_CONCAT(e.name || ' @ ' || w.name, ' | ') AS entities "
+            "FROM entities e JOIN workspaces w ON w.id = e.workspace_id WHERE e.content_hash IS NOT NULL "
+            "GROUP BY e.kind, e.content_hash HAVING COUNT(*) > 1 ORDER BY copies DESC"
+        ).fetchall()
+
+    def zombies(self, stale_days=DEFAULT_STALE_DAYS):
+        cutoff = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(time.time() - stale_days * 86400))
+        stale = self.conn.execute(
+            "SELECT e.*, w.name AS workspace_name FROM entities e JOIN workspaces w ON w.id = e.workspace_id "
+            "WHERE e.updated_at < ? ORDER BY e.updated_at", (cutoff,)).fetchall()
+        empty = self.conn.execute(
+            "SELECT e.*, w.name AS workspace_name FROM entities e JOIN workspaces w ON w.id = e.workspace_id "
+            "WHERE e.item_count = 0 ORDER BY e.kind, e.name").fetchall()
+        empty_workspaces = self.conn.execute(
+            "SELECT w.* FROM workspaces w WHERE w.crawl_error IS NULL "
+            "AND NOT EXISTS (SELECT 1 FROM entities e WHERE e.workspace_id = w.id) ORDER BY w.name").fetchall()
+        return stale, empty, empty_workspaces
+
+    def counts(self):
+        counts = {row['kind']: row['n'] for row in
+                  self.conn.execute("SELECT kind, COUNT(*) AS n FROM entities GROUP BY kind")}
+        counts['workspace'] = self.conn.execute("SELECT COUNT(*) FROM workspaces").fetchone()[0]
+        return counts
+
+
+class Crawler:
+    """HTTP side: paginated listings and detail fetches over one pooled session."""
+
+    def __init__(self, headers, workers=DEFAULT_WORKERS):
+        self.headers = headers
+        self.workers = workers
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.api_calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, params=None):
+        with self._lock:
+            self.api_calls += 1
+        resp = ingest_api.api_request('GET', f"{ingest_api.BASE_URL}{path}", self.headers,
+                                      session=self.session, params=params, timeout=60)
+        if resp.status_code != 200:
+            raise ingest_api.IngestError(f"GET {path}: {resp.status_code} {resp.text[:200]}")
+        return resp.json()
+
+    def paginate(self, path, key, params):
+        """
+        Follow whichever pagination the endpoint speaks: meta.nextCursor (APIs)
+        or limit/offset (collections). Endpoints without either return one page.
+        Stops as soon as a page adds no new ids or a cursor comes back twice.
+        """
+        params = dict(params, limit=PAGE_SIZE)
+        if key == "collections":
+            params['offset'] = 0
+        seen = {}
+        cursors = set()
+        while True:
+            body = self.get(path, params)
+            page = body.get(key, [])
+            new = [item for item in page if item['id'] not in seen]
+            seen.update((item['id'], item) for item in new)
+            cursor = (body.get('meta') or {}).get('nextCursor')
+            if cursor and new and cursor not in cursors:
+                # A server that hands back a cursor it already gave, or a page
+                # of ids we already have, would otherwise be followed forever
+                cursors.add(cursor)
+                params['cursor'] = cursor
+            elif 'offset' in params and len(page) == PAGE_SIZE and new:
+                params['offset'] += PAGE_SIZE
+            else:
+                return list(seen.values())
+
+    def workspaces(self):
+        return self.get("/workspaces").get('workspaces', [])
+
+    def listing(self, workspace_id):
+        return {kind: self.paginate(path, key, {"workspace": workspace_id})
+                for kind, (path, key, _) in ENTITY_KINDS.items()}
+
+    def detail(self, kind, entity_id):
+        detail_path = ENTITY_KINDS[kind][2]
+        return self.get(detail_path.format(id=entity_id))[kind]
+
+
+def crawl(inventory, crawler, refetch=False):
+    crawl_id = inventory.start_crawl()
+    workspaces = crawler.workspaces()
+    inventory.upsert_workspaces(workspaces, crawl_id)
+    pruned = inventory.prune_workspaces(crawl_id)
+    print(f"🗂️  {len(workspaces)} workspaces ({pruned} gone since last crawl), {crawler.workers} workers")
+
+    details = failures = 0
+    with ThreadPoolExecutor(max_workers=crawler.workers) as pool:
+        listings = {pool.submit(crawler.listing, ws['id']): ws for ws in workspaces}
+        detail_futures = {}
+        for future in as_completed(listings):
+            ws = listings[future]
+            try:
+                listing = future.result()
+            except (ingest_api.IngestError, requests.RequestException) as e:
+                failures += 1
+                inventory.record_error(ws['id'], str(e))
+                print(f"   ❌ {ws.get('name')}: {e}")
+                continue
+            stale = inventory.record_listing(ws['id'], listing, crawl_id)
+            if refetch:
+                stale = [(kind, e['id']) for kind, entities in listing.items() if ENTITY_KINDS[kind][2]
+                         for e in entities]
+            for kind, entity_id in stale:
+                detail_futures[pool.submit(crawler.detail, kind, entity_id)] = (kind, entity_id)
+
+        for future in as_completed(detail_futures):
+            kind, entity_id = detail_futures[future]
+            try:
+                digest, item_count = summarize_detail(kind, future.result())
+            except (ingest_api.IngestError, requests.RequestException) as e:
+                failures += 1
+                print(f"   ⚠️  {kind} {entity_id}: {e}")
+                continue
+            inventory.record_detail(kind, entity_id, inventory.updated_at(kind, entity_id), digest, item_count)
+            details += 1
+
+    inventory.finish_crawl(crawl_id, crawler.api_calls, details)
+    counts = inventory.counts()
+    print(f"   ✅ {counts.get('collection', 0)} collections, {counts.get('environment', 0)} environments, "
+          f"{counts.get('api', 0)} APIs indexed")
+    print(f"   📡 {crawler.api_calls} API calls, {details} detail fetch(es) (unchanged entities skipped)")
+    return failures
+
+
+def print_rows(rows, columns):
+    for row in rows:
+        print("   " + "  ".join(str(row[c] if row[c] is not None else '-') for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl Postman workspaces into a local SQLite inventory")
+    parser.add_argument('--db', default=INVENTORY_FILE, help="inventory database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    crawl_cmd = sub.add_parser('crawl', help="fetch workspaces and everything in them (incremental)")
+    crawl_cmd.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="parallel API requests")
+    crawl_cmd.add_argument('--refetch', action='store_true', help="fetch every detail, ignoring updatedAt")
+
+    find = sub.add_parser('find', help="look up entities by name")
+    find.add_argument('pattern')
+    find.add_argument('--kind', choices=sorted(ENTITY_KINDS))
+
+    sub.add_parser('duplicates', help="entities sharing a name, or with identical content")
+    zombies = sub.add_parser('zombies', help="stale or empty entities and empty workspaces")
+    zombies.add_argument('--stale-days', type=int, default=DEFAULT_STALE_DAYS)
+    args = parser.parse_args(argv)
+
+    inventory = Inventory(args.db)
+    try:
+        if args.command == 'crawl':
+            crawler = Crawler(ingest_api.load_headers(), args.workers)
+            return 1 if crawl(inventory, crawler, args.refetch) else 0
+
+        last = inventory.last_crawl()
+        if not last:
+            print(f"⚠️  '{args.db}' is empty. Run 'python inventory.py crawl' first.")
+            return 1
+        print(f"ℹ️  Inventory from {time.strftime('%Y-%m-%d %H:%M', time.localtime(last['finished_at']))}")
+
+        if args.command == 'find':
+            rows = inventory.find(args.pattern, args.kind)
+            print(f"🔍 {len(rows)} match(es) for '{args.pattern}'")
+            print_rows(rows, ('kind', 'name', 'id', 'workspace_name', 'updated_at'))
+        elif args.command == 'duplicates':
+            by_name = inventory.duplicate_names()
+            print(f"\n👯 Same name ({len(by_name)}):")
+            print_rows(by_name, ('kind', 'copies', 'name', 'workspaces'))
+            by_content = inventory.duplicate_contents()
+            print(f"\n🧬 Identical content ({len(by_content)}):")
+            print_rows(by_content, ('kind', 'copies', 'entities'))
+        else:
+            stale, empty, empty_workspaces = inventory.zombies(args.stale_days)
+            print(f"\n🧟 Not updated in {args.stale_days}+ days ({len(stale)}):")
+            print_rows(stale, ('kind', 'updated_at', 'name', 'workspace_name'))
+            print(f"\n🕳️  Empty collections / environments ({len(empty)}):")
+            print_rows(empty, ('kind', 'name', 'workspace_name'))
+            print(f"\n🏚️  Empty workspaces ({len(empty_workspaces)}):")
+            print_rows(empty_workspaces, ('name', 'id'))
+        return 0
+    finally:
+        inventory.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import copy
+import json
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - LOCAL OPENAPI -> COLLECTION CONVERTER
+# =============================================================================
+#
+# ROLE: Turn an OpenAPI 3.x spec into a Postman Collection v2.1 document
+#       WITHOUT calling Postman, so collections can be built (and cached,
+#       reviewed, diffed) offline.
+#
+# The output mirrors what `POST /import/openapi` produces (see
+# Payment_Refund_Collection.json): one folder per path segment, one request
+# per operation named after its summary, `{{baseUrl}}` URLs with `:param`
+# path variables, and one saved response per documented status code.
+# =============================================================================
+
+COLLECTION_SCHEMA = "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+MAX_EXAMPLE_DEPTH = 8
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 202: "Accepted", 204: "No Content",
+    400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+    409: "Conflict", 422: "Unprocessable Entity", 429: "Too Many Requests",
+    500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+
+def resolve_ref(spec_data, node):
+    """Follow local '#/...' $refs until a concrete node is reached."""
+    seen = set()
+    while isinstance(node, dict) and '$ref' in node:
+        ref = node['$ref']
+        if ref in seen or not ref.startswith('#/'):
+            return node
+        seen.add(ref)
+        target = spec_data
+        for part in ref[2:].split('/'):
+            target = target.get(part.replace('~1', '/').replace('~0', '~'), {})
+        node = target
+    return node
+
+
+def example_from_schema(spec_data, schema, depth=0):
+    """Build a representative example value from a JSON Schema."""
+    schema = resolve_ref(spec_data, schema or {})
+    if depth > MAX_EXAMPLE_DEPTH:
+        return None
+    if 'example' in schema:
+        return copy.deepcopy(schema['example'])
+    if 'default' in schema:
+        return copy.deepcopy(schema['default'])
+    if schema.get('enum'):
+        return schema['enum'][0]
+    for combinator in ('allOf', 'oneOf', 'anyOf'):
+        if schema.get(combinator):
+            if combinator != 'allOf':
+                return example_from_schema(spec_data, schema[combinator][0], depth + 1)
+            merged = {}
+            for part in schema['allOf']:
+                value = example_from_schema(spec_data, part, depth + 1)
+                if isinstance(value, dict):
+                    merged.update(value)
+            return merged
+
+    schema_type = schema.get('type') or ('object' if 'properties' in schema else None)
+    if schema_type == 'object':
+        return {name: example_from_schema(spec_data, prop, depth + 1)
+                for name, prop in (schema.get('properties') or {}).items()}
+    if schema_type == 'array':
+        return [example_from_schema(spec_data, schema.get('items'), depth + 1)]
+    if schema_type == 'integer':
+        return schema.get('minimum', 0)
+    if schema_type == 'number':
+        return schema.get('minimum', 0)
+    if schema_type == 'boolean':
+        return True
+    if schema_type == 'string':
+        return f"<{schema.get('format', 'string')}>"
+    return None
+
+
+def _media_example(spec_data, media):
+    """Pick the first explicit example of a media type, else derive one."""
+    media = resolve_ref(spec_data, media or {})
+    if 'example' in media:
+        return media['example']
+    for example in (media.get('examples') or {}).values():
+        example = resolve_ref(spec_data, example)
+        if 'value' in example:
+            return example['value']
+    return example_from_schema(spec_data, media.get('schema'))
+
+
+def _json_media(content):
+    for media_type, media in (content or {}).items():
+        if 'json' in media_type:
+            return media_type, media
+    return next(iter((content or {}).items()), (None, None))
+
+
+def _parameters(spec_data, path_item, operation):
+    # Operation-level parameters override path-level ones with the same name/location
+    merged = {}
+    for param in (path_item.get('parameters') or []) + (operation.get('parameters') or []):
+        param = resolve_ref(spec_data, param)
+        merged[(param.get('name'), param.get('in'))] = param
+    return list(merged.values())
+
+
+def _param_value(spec_data, param):
+    if 'example' in param:
+        value = param['example']
+    else:
+        value = example_from_schema(spec_data, param.get('schema'))
+    return '' if value is None else str(value)
+
+
+def _describe(param):
+    description = (param.get('description') or '').strip()
+    return f"(Required) {description}" if param.get('required') else description
+
+
+def _url(spec_data, path, params):
+    segments = [f":{s[1:-1]}" if s.startswith('{') and s.endswith('}') else s
+                for s in path.strip('/').split('/') if s]
+    query = [p for p in params if p.get('in') == 'query']
+    path_params = [p for p in params if p.get('in') == 'path']
+
+    raw = "{{baseUrl}}/" + '/'.join(segments)
+    if query:
+        raw += '?' + '&'.join(f"{p['name']}={_param_value(spec_data, p)}" for p in query)
+
+    url = {"raw": raw, "host": ["{{baseUrl}}"], "path": segments}
+    if query:
+        url["query"] = [{"key": p['name'], "value": _param_value(spec_data, p),
+                         "description": _describe(p), **({} if p.get('required') else {"disabled": True})}
+                        for p in query]
+    if path_params:
+        url["variable"] = [{"key": p['name'], "value": _param_value(spec_data, p),
+                            "description": _describe(p)} for p in path_params]
+    return url
+
+
+def _request(spec_data, method, path, path_item, operation):
+    params = _parameters(spec_data, path_item, operation)
+    headers = [{"key": p['name'], "value": _param_value(spec_data, p), "description": _describe(p)}
+               for p in params if p.get('in') == 'header']
+
+    request = {"method": method.upper(), "header": headers}
+
+    body = resolve_ref(spec_data, operation.get('requestBody') or {})
+    media_type, media = _json_media(body.get('content'))
+    if media_type:
+        headers.append({"key": "Content-Type", "value": media_type})
+        example = _media_example(spec_data, media)
+        request["body"] = {
+            "mode": "raw",
+            "raw": json.dumps(example, indent=2) if 'json' in media_type else str(example or ''),
+            "options": {"raw": {"headerFamily": "json", "language": "json"}},
+        }
+
+    for code, response in (operation.get('responses') or {}).items():
+        response_type, _ = _json_media(resolve_ref(spec_data, response).get('content'))
+        if response_type:
+            headers.append({"key": "Accept", "value": response_type})
+            break
+
+    request["url"] = _url(spec_data, path, params)
+    if operation.get('description'):
+        request["description"] = operation['description']
+    return request
+
+
+def _responses(spec_data, request, operation):
+    responses = []
+    for code, response in (operation.get('responses') or {}).items():
+        response = resolve_ref(spec_data, response)
+        code_int = int(code) if str(code).isdigit() else 200
+        media_type, media = _json_media(response.get('content'))
+
+        # The saved example records the request that produced it (no body/description)
+        original = {k: copy.deepcopy(v) for k, v in request.items() if k not in ('description', 'body')}
+        if 'body' in request:
+            original['body'] = copy.deepcopy(request['body'])
+
+        entry = {
+            "name": (response.get('description') or STATUS_TEXT.get(code_int, str(code))).strip(),
+            "originalRequest": original,
+            "status": STATUS_TEXT.get(code_int, ''),
+            "code": code_int,
+            "_postman_previewlanguage": "json" if media_type and 'json' in media_type else "text",
+            "header": [{"key": "Content-Type", "value": media_type}] if media_type else [],
+            "cookie": [],
+        }
+        if media_type:
+            example = _media_example(spec_data, media)
+            entry["body"] = json.dumps(example, indent=2) if 'json' in media_type else str(example or '')
+        responses.append(entry)
+    return responses
+
+
+def iter_operations(spec_data):
+    """Yield (method, path, path_item, operation) for every operation in the spec."""
+    for path, path_item in (spec_data.get('paths') or {}).items():
+        path_item = resolve_ref(spec_data, path_item or {})
+        for method in HTTP_METHODS:
+            if isinstance(path_item.get(method), dict):
+                yield method, path, path_item, path_item[method]
+
+
+def build_item(spec_data, method, path, path_item, operation):
+    """One Postman request item for one OpenAPI operation."""
+    request = _request(spec_data, method, path, path_item, operation)
+    return {
+        "name": operation.get('summary') or operation.get('operationId') or f"{method.upper()} {path}",
+        "request": request,
+        "response": _responses(spec_data, request, operation),
+    }
+
+
+def _collection_auth(spec_data):
+    schemes = (spec_data.get('components') or {}).get('securitySchemes') or {}
+    for requirement in spec_data.get('security') or []:
+        for name in requirement:
+            scheme = resolve_ref(spec_data, schemes.get(name, {}))
+            if scheme.get('type') == 'oauth2':
+                flow = next(iter((scheme.get('flows') or {}).items()), (None, {}))
+                grant = {"authorizationCode": "authorization_code", "clientCredentials": "client_credentials",
+                         "password": "password_credentials", "implicit": "implicit"}.get(flow[0], flow[0])
+                settings = [("scope", ' '.join((flow[1].get('scopes') or {}).keys())),
+                            ("accessTokenUrl", flow[1].get('tokenUrl')),
+                            ("authUrl", flow[1].get('authorizationUrl')),
+                            ("grant_type", grant)]
+                return {"type": "oauth2",
+                        "oauth2": [{"key": k, "value": v, "type": "string"} for k, v in settings if v]}
+            if scheme.get('type') == 'http' and scheme.get('scheme') == 'bearer':
+                return {"type": "bearer",
+                        "bearer": [{"key": "token", "value": "{{jwt_token}}", "type": "string"}]}
+            if scheme.get('type') == 'apiKey':
+                return {"type": "apikey",
+                        "apikey": [{"key": "key", "value": scheme.get('name'), "type": "string"},
+                                   {"key": "value", "value": "{{apiKey}}", "type": "string"},
+                                   {"key": "in", "value": scheme.get('in', 'header'), "type": "string"}]}
+    return None
+
+
+def convert(spec_data, name=None):
+    """Convert a parsed OpenAPI document into a Collection v2.1 dict (no envelope)."""
+    info = spec_data.get('info') or {}
+    root = {"item": []}
+    folders = {(): root}
+
+    for method, path, path_item, operation in iter_operations(spec_data):
+        segments = tuple(s for s in path.strip('/').split('/') if s)
+        # Folder per path segment, e.g. /refunds/{refundId}/status -> refunds/{refundId}/status
+        for depth in range(1, len(segments) + 1):
+            key = segments[:depth]
+            if key not in folders:
+                folder = {"name": key[-1], "item": []}
+                folders[key[:-1]]["item"].append(folder)
+                folders[key] = folder
+        folders[segments]["item"].append(build_item(spec_data, method, path, path_item, operation))
+
+    collection = {
+        "info": {
+            "name": name or info.get('title', 'Imported API'),
+            "description": info.get('description', ''),
+            "schema": COLLECTION_SCHEMA,
+        },
+        "item": root["item"],
+    }
+    auth = _collection_auth(spec_data)
+    if auth:
+        collection["auth"] = auth
+    servers = spec_data.get('servers') or []
+    collection["variable"] = [{"key": "baseUrl", "value": servers[0].get('url', '/') if servers else '/'}]
+    return collection
@@ -0,0 +1,225 @@
+import os
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - PROFILING MODE
+# =============================================================================
+#
+# ROLE: Answer "where did the time / memory go?" for an ingestion run.
+#       `python ingest_api.py --profile` wraps every pipeline block of every
+#       spec with cProfile + tracemalloc.
+#
+# OUTPUT (default: .postman_profile/):
+#   summary.txt          - wall vs CPU time per block and per spec (wall - CPU
+#                          is roughly time spent waiting on the network)
+#   blocks/<block>.txt   - top functions per block (+ .prof for snakeviz etc.)
+#   specs/<spec>.prof    - all blocks of one spec
+#   memory.txt           - peak memory and top allocation sites per block
+#   stacks.collapsed     - "a;b;c <microseconds>" lines for flamegraph.pl /
+#                          speedscope
+#
+# DISABLED (the default): block() returns one shared no-op context manager,
+# so the instrumented code pays a function call and nothing else.
+# =============================================================================
+
+DEFAULT_OUTPUT_DIR = ".postman_profile"
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 10
+MAX_STACK_DEPTH = 64
+
+_NOOP = contextlib.nullcontext()
+
+
+class _Measurement:
+    __slots__ = ('spec', 'block', 'wall', 'cpu', 'peak', 'stats', 'allocations')
+
+    def __init__(self, spec, block):
+        self.spec = spec
+        self.block = block
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = DEFAULT_OUTPUT_DIR
+        self.measurements = []
+        self._spec = None
+        self._active = False
+        self._thread = None
+
+    def enable(self, output_dir=DEFAULT_OUTPUT_DIR):
+        self.enabled = True
+        self.output_dir = output_dir
+        self._thread = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)   # allocation sites only need the innermost frame
+
+    def _profiling(self):
+        # cProfile and the spec label are per instance, so only the enabling thread is measured
+        return self.enabled and threading.get_ident() == self._thread
+
+    def spec(self, name):
+        """Label the blocks that run inside this context with a spec name."""
+        if not self._profiling():
+            return _NOOP
+        return self._spec_context(name)
+
+    @contextlib.contextmanager
+    def _spec_context(self, name):
+        previous, self._spec = self._spec, name
+        try:
+            yield
+        finally:
+            self._spec = previous
+
+    def block(self, name):
+        # Nested blocks are attributed to the outer one (one cProfile at a time)
+        if not self._profiling() or self._active:
+            return _NOOP
+        return self._block_context(name)
+
+    @contextlib.contextmanager
+    def _block_context(self, name):
+        measurement = _Measurement(self._spec or '(global)', name)
+        profile = cProfile.Profile()
+        self._active = True
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base_memory = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            measurement.wall = time.perf_counter() - wall
+            measurement.cpu = time.process_time() - cpu
+            measurement.peak = tracemalloc.get_traced_memory()[1] - base_memory
+            after = tracemalloc.take_snapshot()
+            measurement.allocations = after.compare_to(before, 'lineno')[:TOP_ALLOCATIONS]
+            measurement.stats = profile
+            self._active = False
+            self.measurements.append(measurement)
+
+    # --- reporting -----------------------------------------------------------
+
+    def write_report(self):
+        if not self.enabled or not self.measurements:
+            return None
+        os.makedirs(os.path.join(self.output_dir, 'blocks'), exist_ok=True)
+        os.makedirs(os.path.join(self.output_dir, 'specs'), exist_ok=True)
+
+        by_block, by_spec = {}, {}
+        for m in self.measurements:
+            by_block.setdefault(m.block, []).append(m)
+            by_spec.setdefault(m.spec, []).append(m)
+
+        self._write_summary(by_block, by_spec)
+        for block, items in by_block.items():
+            stats = _merge_stats(items)
+            stats.dump_stats(os.path.join(self.output_dir, 'blocks', f"{_safe(block)}.prof"))
+            with open(os.path.join(self.output_dir, 'blocks', f"{_safe(block)}.txt"), 'w', encoding='utf-8') as f:
+                stats.stream = f
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        for spec, items in by_spec.items():
+            _merge_stats(items).dump_stats(os.path.join(self.output_dir, 'specs', f"{_safe(spec)}.prof"))
+        self._write_memory(by_block)
+        self._write_collapsed()
+        return self.output_dir
+
+    def _write_summary(self, by_block, by_spec):
+        with open(os.path.join(self.output_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            for title, groups in (("BLOCK", by_block), ("SPEC", by_spec)):
+                f.write(f"{title:<40} {'wall s':>10} {'cpu s':>10} {'wait s':>10} {'peak MB':>10}\n")
+                for name, items in sorted(groups.items(), key=lambda kv: -sum(m.wall for m in kv[1])):
+                    wall = sum(m.wall for m in items)
+                    cpu = sum(m.cpu for m in items)
+                    peak = max(m.peak for m in items) / (1024 * 1024)
+                    f.write(f"{name[:40]:<40} {wall:>10.3f} {cpu:>10.3f} {max(wall - cpu, 0):>10.3f} {peak:>10.2f}\n")
+                f.write("\n")
+
+    def _write_memory(self, by_block):
+        with open(os.path.join(self.output_dir, 'memory.txt'), 'w', encoding='utf-8') as f:
+            for block, items in by_block.items():
+                f.write(f"== {block}: peak {max(m.peak for m in items) / 1024:.1f} KiB\n")
+                totals = {}
+                for m in items:
+                    for stat in m.allocations:
+                        frame = stat.traceback[0]
+                        key = f"{frame.filename}:{frame.lineno}"
+                        totals[key] = totals.get(key, 0) + stat.size_diff
+                for site, size in sorted(totals.items(), key=lambda kv: -abs(kv[1]))[:TOP_ALLOCATIONS]:
+                    f.write(f"   {size / 1024:>10.1f} KiB  {site}\n")
+                f.write("\n")
+
+    def _write_collapsed(self):
+        lines = {}
+        for m in self.measurements:
+            for stack, micros in collapsed_stacks(pstats.Stats(m.stats)):
+                key = f"{m.spec};{m.block};{stack}"
+                lines[key] = lines.get(key, 0) + micros
+        with open(os.path.join(self.output_dir, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, micros in lines.items():
+                f.write(f"{stack} {micros}\n")
+
+
+def _safe(name):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+
+
+def _merge_stats(measurements):
+    stats = pstats.Stats(measurements[0].stats)
+    for m in measurements[1:]:
+        stats.add(m.stats)
+    return stats
+
+
+def _label(func):
+    filename, lineno, name = func
+    return f"{os.path.basename(filename)}:{name}" if filename != '~' else name.strip('<>')
+
+
+def collapsed_stacks(stats):
+    """
+    Reconstruct approximate call stacks from cProfile's caller graph.
+
+    cProfile only records caller->callee edges, so a function's self time is
+    split across the paths that reach it in proportion to each edge's
+    cumulative time (the same approximation flameprof uses).
+    """
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in raw.items() if not entry[4]]
+
+    out = []
+
+    def visit(func, path, share, path_funcs):
+        total_time, cumulative = raw[func][2], raw[func][3]
+        frames = path + (_label(func),)
+        micros = int(total_time * share * 1_000_000)
+        if micros > 0:
+            out.append((';'.join(frames), micros))
+        if len(frames) >= MAX_STACK_DEPTH or cumulative <= 0:
+            return
+        for callee, edge_cumulative in callees.get(func, ()):
+            if callee in path_funcs or share * edge_cumulative < 1e-6:
+                continue          # recursion (already on this path) or negligible
+            path_funcs.add(callee)
+            visit(callee, frames, share * edge_cumulative / raw[callee][3] if raw[callee][3] else 0, path_funcs)
+            path_funcs.discard(callee)
+
+    for root in roots:
+        visit(root, (), 1.0, {root})
+    return out
+
+
+# Process-wide profiler used by ingest_api.py
+PROFILER = Profiler()
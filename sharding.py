@@ -0,0 +1,64 @@
+import copy
+
+from openapi_to_collection import HTTP_METHODS
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - COLLECTION SHARDING
+# =============================================================================
+#
+# ROLE: Split one very large spec into several smaller collections.
+#
+# WHY: A 500+ operation spec makes one huge collection: slow to import, slow
+#      to GET/PUT on every sync, slow to open in Postman, and a one-operation
+#      change re-uploads everything. Sharded, each collection is small and only
+#      the shards whose content changed are re-published.
+#
+# STRATEGIES:
+#   tag  - by the operation's first OpenAPI tag (e.g. "Refunds", "Health")
+#   path - by the first path segment (e.g. /refunds/..., /health)
+#
+# Every shard is a complete, valid spec: same info/servers/security/components,
+# only the paths narrowed down. All shards share one environment.
+# =============================================================================
+
+SHARD_STRATEGIES = ('tag', 'path')
+UNTAGGED = "Untagged"
+
+
+def _shard_key(strategy, path, operation):
+    if strategy == 'tag':
+        tags = operation.get('tags') or []
+        return tags[0] if tags else UNTAGGED
+    segment = next((s for s in path.strip('/').split('/') if s), '')
+    return segment or 'root'
+
+
+def shard_spec(spec_data, strategy):
+    """Return {shard_name: sub_spec} in spec order. Inputs are not modified."""
+    if strategy not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy '{strategy}' (use one of: {', '.join(SHARD_STRATEGIES)})")
+
+    shard_paths = {}
+    for path, path_item in (spec_data.get('paths') or {}).items():
+        for method in HTTP_METHODS:
+            operation = (path_item or {}).get(method)
+            if not isinstance(operation, dict):
+                continue
+            paths = shard_paths.setdefault(_shard_key(strategy, path, operation), {})
+            if path not in paths:
+                # Keep path-level fields (parameters, servers, ...) on every shard
+                paths[path] = {k: v for k, v in path_item.items() if k not in HTTP_METHODS}
+            paths[path][method] = operation
+
+    # Everything except 'paths' is shared; copy it once, not once per shard
+    shared = {k: v for k, v in spec_data.items() if k != 'paths'}
+    title = (spec_data.get('info') or {}).get('title', 'Imported API')
+    shards = {}
+    for name, paths in shard_paths.items():
+        sub_spec = dict(shared)
+        sub_spec['info'] = dict(shared.get('info') or {}, title=f"{title} - {name}")
+        if strategy == 'tag' and shared.get('tags'):
+            sub_spec['tags'] = [t for t in shared['tags'] if t.get('name') == name]
+        sub_spec['paths'] = copy.deepcopy(paths)
+        shards[name] = sub_spec
+    return shards
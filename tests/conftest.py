@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules live at the repo root; the scripts below talk to the live API on import.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+collect_ignore = ["test_official_payload.py", "test_v10_payload.py"]
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+"""
+ENDPOINT PROBE MATRIX
+Purpose: Replace the hand-rolled, sequential if/else payload scripts
+(diagnostic_specs.py, test_v10_payload.py, final_files_attempt.py) with
+endpoint x payload matrices declared as data (probe_matrices.yaml).
+
+- All combinations run concurrently over one pooled session.
+- Results are cached per (endpoint, payload hash): re-runs only send the
+  combinations not seen before (use --refresh to re-send everything).
+- Output is one comparison table (payload rows x endpoint columns).
+
+Usage:
+    python tests/probe_matrix.py                 # every matrix
+    python tests/probe_matrix.py specs           # one matrix
+    python tests/probe_matrix.py specs --refresh --workers 16
+"""
+
+BASE_URL = "https://api.getpostman.com"
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+MATRIX_FILE = os.path.join(HERE, "probe_matrices.yaml")
+CACHE_FILE = os.path.join(REPO_ROOT, ".postman_probe_cache.json")
+DEFAULT_WORKERS = 8
+SNIPPET_LENGTH = 120
+
+
+def render(value, context):
+    """Substitute {placeholders} in every string of a payload template."""
+    if isinstance(value, str):
+        if value.startswith('{') and value.endswith('}') and value[1:-1] in context:
+            return context[value[1:-1]]
+        for key, replacement in context.items():
+            value = value.replace('{' + key + '}', str(replacement))
+        return value
+    if isinstance(value, dict):
+        return {k: render(v, context) for k, v in value.items()}
+    if isinstance(value, list):
+        return [render(v, context) for v in value]
+    return value
+
+
+def probe_key(method, url, payload):
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{method} {url} {digest}"
+
+
+def build_probes(config, matrix_names, context):
+    probes = []
+    for matrix_name in matrix_names:
+        matrix = config['matrices'][matrix_name]
+        for payload_name in matrix['payloads']:
+            payload = render(config['payloads'][payload_name], context)
+            for endpoint_name in matrix['endpoints']:
+                endpoint = config['endpoints'][endpoint_name]
+                url = BASE_URL + render(endpoint['path'], context)
+                probes.append({
+                    "matrix": matrix_name,
+                    "endpoint": endpoint_name,
+                    "payload": payload_name,
+                    "method": endpoint['method'],
+                    "url": url,
+                    "body": payload,
+                    "key": probe_key(endpoint['method'], url, payload),
+                })
+    return probes
+
+
+def send(session, api_key, probe):
+    headers = {"X-Api-Key": api_key}
+    body = probe['body']
+    kwargs = {}
+    if 'json' in body:
+        kwargs['json'] = body['json']
+    elif 'raw' in body:
+        headers['Content-Type'] = body['raw'].get('content_type', 'text/plain')
+        kwargs['data'] = body['raw']['body'].encode('utf-8')
+    elif 'multipart' in body:
+        kwargs['files'] = {field: tuple(spec) for field, spec in body['multipart'].get('files', {}).items()}
+        kwargs['data'] = body['multipart'].get('data', {})
+    try:
+        resp = session.request(probe['method'], probe['url'], headers=headers, timeout=30, **kwargs)
+        return {"status": resp.status_code, "snippet": resp.text[:SNIPPET_LENGTH].replace('\n', ' ')}
+    except requests.RequestException as e:
+        return {"status": None, "snippet": str(e)[:SNIPPET_LENGTH]}
+
+
+def cacheable(result):
+    # Throttling, server errors and network failures say nothing about the payload
+    return result['status'] is not None and result['status'] != 429 and result['status'] < 500
+
+
+def load_cache():
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cache(cache):
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def run_probes(probes, api_key, workers=DEFAULT_WORKERS, refresh=False):
+    cache = {} if refresh else load_cache()
+    pending = [p for p in probes if p['key'] not in cache]
+    for probe in probes:
+        probe['cached'] = probe['key'] in cache
+
+    if pending:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount("https://", adapter)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda p: (p, send(session, api_key, p)), pending)
+            for probe, result in results:
+                probe['result'] = result
+                if cacheable(result):
+                    cache[probe['key']] = result
+
+        if refresh:
+            # --refresh re-sends everything but keeps unrelated cached entries
+            merged = load_cache()
+            merged.update(cache)
+            cache = merged
+        save_cache(cache)
+
+    for probe in probes:
+        if 'result' not in probe:
+            probe['result'] = cache[probe['key']]
+    return probes, len(pending)
+
+
+def print_table(probes):
+    for matrix_name in dict.fromkeys(p['matrix'] for p in probes):
+        rows = [p for p in probes if p['matrix'] == matrix_name]
+        endpoints = list(dict.fromkeys(p['endpoint'] for p in rows))
+        payloads = list(dict.fromkeys(p['payload'] for p in rows))
+        cells = {(p['payload'], p['endpoint']): p for p in rows}
+
+        width = max(max(len(name) for name in payloads), len('payload')) + 2
+        col = max(max(len(e) for e in endpoints), 8) + 2
+        print("\n" + "=" * (width + col * len(endpoints)))
+        print(f"MATRIX: {matrix_name}   (* = cached)")
+        print("=" * (width + col * len(endpoints)))
+        print(f"{'payload':<{width}}" + ''.join(f"{e:<{col}}" for e in endpoints))
+        for payload in payloads:
+            line = f"{payload:<{width}}"
+            for endpoint in endpoints:
+                probe = cells[(payload, endpoint)]
+                status = probe['result']['status'] or 'ERR'
+                icon = "✅" if isinstance(status, int) and status < 300 else "❌"
+                line += f"{icon} {status}{'*' if probe['cached'] else ''}".ljust(col)
+            print(line)
+
+        # Distinct responses, so different error messages stand out
+        print("\nResponses:")
+        seen = set()
+        for probe in rows:
+            signature = (probe['result']['status'], probe['result']['snippet'])
+            if signature not in seen:
+                seen.add(signature)
+                print(f"  {probe['result']['status']}: {probe['result']['snippet']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run endpoint x payload probe matrices against the Postman API")
+    parser.add_argument('matrices', nargs='*', help="matrix names (default: all)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--refresh', action='store_true', help="ignore cached results")
+    parser.add_argument('--config', default=MATRIX_FILE)
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv('POSTMAN_API_KEY')
+    workspace_id = os.getenv('POSTMAN_WORKSPACE_ID')
+    if not api_key:
+        print("❌ Set POSTMAN_API_KEY environment variable")
+        return 1
+    if not workspace_id:
+        print("❌ Set POSTMAN_WORKSPACE_ID environment variable")
+        return 1
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    matrix_names = args.matrices or list(config['matrices'])
+    unknown = [m for m in matrix_names if m not in config['matrices']]
+    if unknown:
+        print(f"❌ Unknown matrix: {', '.join(unknown)}. Available: {', '.join(config['matrices'])}")
+        return 1
+
+    spec_file = os.path.join(REPO_ROOT, config['spec_file'])
+    with open(spec_file, 'r', encoding='utf-8') as f:
+        spec_content = f.read()
+    spec_data = yaml.safe_load(spec_content)
+    context = {
+        "workspace_id": workspace_id,
+        "spec_content": spec_content,
+        "spec_json": json.dumps(spec_data),
+        "spec_name": spec_data.get('info', {}).get('title', 'Imported API'),
+    }
+
+    probes = build_probes(config, matrix_names, context)
+    print(f"🔬 {len(probes)} probes across {len(matrix_names)} matrix(es), workspace {workspace_id}")
+    probes, sent = run_probes(probes, api_key, args.workers, args.refresh)
+    print(f"   Sent {sent}, reused {len(probes) - sent} from cache ({os.path.relpath(CACHE_FILE, REPO_ROOT)})")
+    print_table(probes)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
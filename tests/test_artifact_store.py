@@ -0,0 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import artifact_store
+from artifact_store import ArtifactStore
+
+
+def test_concurrent_updates_keep_every_record_without_flock(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, 'fcntl', None)      # as on Windows
+    store = ArtifactStore(str(tmp_path))
+    workspaces = [f"ws{n}" for n in range(16)]
+
+    def publish(workspace_id):
+        for slug in ('refunds', 'payments', 'ledger'):
+            store.update_published(workspace_id, slug, {"collection": {"id": f"{workspace_id}-{slug}"}})
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(publish, workspaces))
+
+    published = store.load_published()
+    assert sorted(published) == sorted(workspaces)
+    assert all(len(published[ws]) == 3 for ws in workspaces)
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith('.tmp')]
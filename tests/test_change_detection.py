@@ -0,0 +1,77 @@
+import json
+import subprocess
+
+import pytest
+
+from change_detection import detect
+
+
+def git(repo, *args):
+    return subprocess.run(('git', '-c', 'user.name=test', '-c', 'user.email=test@example.com') + args,
+                          cwd=repo, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def write(repo, path, text):
+    target = repo / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text, encoding='utf-8')
+
+
+def commit(repo, message):
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', message)
+    return git(repo, 'rev-parse', 'HEAD')
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / 'specs-repo'
+    root.mkdir()
+    git(root, 'init', '-q')
+    write(root, 'specs/a.yaml', "openapi: 3.0.0\ninfo: {title: A}\n"
+                                "components:\n  schemas:\n    Error: {$ref: '../shared/errors.yaml#/Error'}\n")
+    write(root, 'specs/b.yaml', "openapi: 3.0.0\ninfo: {title: B}\npaths: {}\n")
+    # Minified JSON: the whole spec on one line, "openapi" not first
+    write(root, 'specs/c.json', json.dumps({"info": {"title": "C"}, "openapi": "3.0.0", "components": {
+        "schemas": {"Error": {"$ref": "../shared/errors.yaml#/Error"}}}}, separators=(',', ':')))
+    write(root, 'shared/errors.yaml', "Error:\n  allOf:\n    - $ref: './common.yaml#/Base'\n")
+    write(root, 'shared/common.yaml', "Base: {type: object}\n")
+    write(root, 'docs/notes.json', '{"title": "not a spec"}')
+    return root, commit(root, 'initial')
+
+
+def affected(root, base, head):
+    specs, _, _, _ = detect(base, head, graph_file=str(root.parent / 'graph.json'), cwd=str(root))
+    return specs
+
+
+def test_shared_file_change_selects_every_spec_that_reaches_it(repo):
+    root, first = repo
+    write(root, 'shared/common.yaml', "Base: {type: object, required: [code]}\n")
+    assert affected(root, first, commit(root, 'tighten Base')) == ['specs/a.yaml', 'specs/c.json']
+
+
+def test_minified_json_spec_change_selects_it(repo):
+    root, first = repo
+    write(root, 'specs/c.json', '{"openapi":"3.0.0","info":{"title":"C2"}}')
+    write(root, 'docs/notes.json', '{"title": "still not a spec"}')
+    assert affected(root, first, commit(root, 'retitle C')) == ['specs/c.json']
+
+
+def test_renames_select_the_new_paths(repo):
+    root, first = repo
+    git(root, 'mv', 'shared/common.yaml', 'shared/base.yaml')
+    write(root, 'shared/errors.yaml', "Error:\n  allOf:\n    - $ref: './base.yaml#/Base'\n")
+    git(root, 'mv', 'specs/b.yaml', 'specs/b2.yaml')
+    assert affected(root, first, commit(root, 'renames')) == ['specs/a.yaml', 'specs/b2.yaml', 'specs/c.json']
+
+
+def test_graph_is_reused_between_runs(repo, tmp_path):
+    root, first = repo
+    graph = str(tmp_path / 'graph.json')
+    _, _, scanned, _ = detect(first, first, graph_file=graph, cwd=str(root))
+    assert scanned == 6
+    write(root, 'specs/b.yaml', "openapi: 3.0.0\ninfo: {title: B2}\npaths: {}\n")
+    head = commit(root, 'retitle B')
+    specs, _, scanned, _ = detect(first, head, graph_file=graph, cwd=str(root))
+    assert (specs, scanned) == (['specs/b.yaml'], 1)
@@ -0,0 +1,89 @@
+import os
+import json
+
+import pytest
+import yaml
+
+from collection_compaction import HEADER_SCRIPT_MARKER, compact_collection
+from contract_tests import add_contract_tests
+from openapi_to_collection import convert
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _hoisted_headers(node):
+    """Headers a folder's compaction script adds, as [(key, value)]."""
+    for event in node.get('event') or []:
+        lines = (event.get('script') or {}).get('exec') or []
+        if lines[:1] == [HEADER_SCRIPT_MARKER]:
+            return [(h['key'], h['value']) for h in json.loads(lines[1].split('.forEach')[0])]
+    return []
+
+
+def effective_requests(collection):
+    """What each request sends once Postman applies auth inheritance and folder scripts, in tree order."""
+    result = []
+
+    def walk(node, auth, scripts, path):
+        for item in node.get('item') or []:
+            if 'item' in item:
+                walk(item, item.get('auth') or auth, scripts + _hoisted_headers(item), path + (item.get('name'),))
+                continue
+            request = dict(item['request'])
+            headers = [(h['key'], h['value']) for h in request.pop('header', None) or [] if not h.get('disabled')]
+            for key, value in scripts:      # outer folders run first; each skips headers already set
+                if key.lower() not in {k.lower() for k, _ in headers}:
+                    headers.append((key, value))
+            result.append({
+                "path": path + (item.get('name'),),
+                "auth": request.pop('auth', None) or auth,
+                "headers": sorted(headers),
+                "request": {k: v for k, v in request.items() if k != 'description'},
+                "event": item.get('event') or [],
+            })
+
+    walk(collection, collection.get('auth'), _hoisted_headers(collection), ())
+    return result
+
+
+def generated_collection():
+    with open(os.path.join(ROOT, 'payment-refund-api-openapi.yaml'), 'r', encoding='utf-8') as f:
+        spec_data = yaml.safe_load(f)
+    collection = convert(spec_data)
+    add_contract_tests(collection, spec_data)
+    return collection
+
+
+def exported_collection():
+    with open(os.path.join(ROOT, 'Payment_Refund_Collection.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def nested_auth_collection():
+    bearer = {"type": "bearer", "bearer": [{"key": "token", "value": "{{token}}", "type": "string"}]}
+
+    def request(name, auth):
+        return {"name": name, "request": {
+            "method": "GET", "url": {"raw": f"{{{{baseUrl}}}}/{name}"}, "auth": auth,
+            "header": [{"key": "Accept", "value": "application/json"}, {"key": "X-Team", "value": "payments"}]}}
+
+    return {"info": {"name": "nested"}, "item": [
+        {"name": "F", "item": [request(f"f{n}", bearer) for n in range(3)]},
+        {"name": "G", "item": [request("g0", bearer), request("public", {"type": "noauth"})]},
+    ]}
+
+
+@pytest.mark.parametrize('make', [generated_collection, exported_collection, nested_auth_collection])
+@pytest.mark.parametrize('policy', [None, {"hoist_headers": True}])
+def test_compaction_does_not_change_what_requests_send(make, policy):
+    collection = make()
+    compacted, report = compact_collection(collection, policy)
+    assert effective_requests(compacted) == effective_requests(collection)
+    assert report.bytes_after <= report.bytes_before
+
+
+def test_headers_stay_on_requests_by_default():
+    compacted, report = compact_collection(nested_auth_collection())
+    assert report.headers_hoisted == 0
+    assert all(len(item['request']['header']) == 2 for folder in compacted['item'] for item in folder['item'])
+    assert not any(_hoisted_headers(folder) for folder in compacted['item'])
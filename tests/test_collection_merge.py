@@ -0,0 +1,197 @@
+import io
+import copy
+import json
+
+from artifact_store import canonical_bytes
+from collection_merge import merge_collections, merge_files
+
+OP_INDEX = {"POST /refunds": "createRefund", "GET /refunds/{}": "getRefund"}
+
+
+def request(name, method, path, body=None):
+    return {
+        "name": name,
+        "request": {
+            "method": method,
+            "url": {"raw": "{{baseUrl}}/" + path, "host": ["{{baseUrl}}"], "path": path.split('/')},
+            "body": {"mode": "raw", "raw": body or ""},
+        },
+    }
+
+
+def script_event(name):
+    return {"listen": "test", "script": {"type": "text/javascript", "exec": [f"pm.test('{name}', function () {{}});"]}}
+
+
+def generated():
+    return {
+        "info": {"name": "Payment Refund API"},
+        "item": [{
+            "name": "refunds",
+            "item": [
+                request("Create a new refund", "POST", "refunds", '{"amount": 10}'),
+                request("Get refund", "GET", "refunds/:refundId"),
+            ],
+        }],
+    }
+
+
+def live_with_ids(collection):
+    live = copy.deepcopy(collection)
+    for n, item in enumerate(live['item'][0]['item']):
+        item['id'] = f"id-{n}"
+    return live
+
+
+def requests_by_name(items, found=None):
+    found = {} if found is None else found
+    for item in items:
+        if 'item' in item:
+            requests_by_name(item['item'], found)
+        else:
+            found[item['name']] = item
+    return found
+
+
+def test_developer_copies_of_a_generated_request_are_kept():
+    base = generated()
+    theirs = live_with_ids(base)
+    folder = theirs['item'][0]['item']
+    over_limit = request("Create refund - over limit", "POST", "refunds", '{"amount": 99999}')
+    over_limit['event'] = [script_event("rejects amounts over the limit")]
+    zero = request("Create refund - zero amount", "POST", "refunds", '{"amount": 0}')
+    folder.insert(1, over_limit)
+    folder.append(zero)
+    ours = generated()
+    ours['item'][0]['item'][0]['request']['body']['raw'] = '{"amount": 10, "reason": "duplicate"}'
+
+    merged, report = merge_collections(base, theirs, ours, op_index=OP_INDEX)
+
+    found = requests_by_name(merged['item'])
+    assert set(found) == {"Create a new refund", "Get refund",
+                          "Create refund - over limit", "Create refund - zero amount"}
+    assert found["Create a new refund"]['request']['body']['raw'] == '{"amount": 10, "reason": "duplicate"}'
+    assert found["Create a new refund"]['id'] == "id-0"
+    assert 'event' not in found["Create a new refund"]
+    assert found["Create refund - over limit"] == over_limit
+    assert found["Create refund - zero amount"] == zero
+    assert report.kept_manual_items == 2
+    assert report.conflicts == []
+
+
+def test_renamed_generated_request_still_matches_by_folder():
+    base = generated()
+    theirs = live_with_ids(base)
+    theirs['item'][0]['item'][0]['name'] = "Create refund (happy path)"
+    ours = generated()
+
+    merged, report = merge_collections(base, theirs, ours, op_index=OP_INDEX)
+
+    names = [item['name'] for item in merged['item'][0]['item']]
+    assert names == ["Create refund (happy path)", "Get refund"]
+    assert report.kept_manual_items == 0
+
+
+def test_hand_made_folders_keep_their_name_and_scripts():
+    base = generated()
+    theirs = live_with_ids(base)
+    smoke = {
+        "name": "Smoke",
+        "auth": {"type": "noauth"},
+        "event": [script_event("responds quickly")],
+        "item": [request("Create refund - smoke", "POST", "refunds"),
+                 {"name": "Nested", "item": [request("Health", "GET", "health")]}],
+    }
+    theirs['item'].append(smoke)
+
+    merged, report = merge_collections(base, theirs, generated(), op_index=OP_INDEX)
+
+    assert [item['name'] for item in merged['item']] == ["refunds", "Smoke"]
+    assert merged['item'][1] == smoke
+    assert report.kept_manual_folders == 2
+    assert report.kept_manual_items == 2
+
+
+def test_requests_removed_from_the_spec_drop_only_the_generated_copy():
+    base = generated()
+    theirs = live_with_ids(base)
+    theirs['item'][0]['item'].append(request("Get refund - unknown id", "GET", "refunds/:refundId"))
+    ours = generated()
+    del ours['item'][0]['item'][1]
+
+    merged, report = merge_collections(base, theirs, ours, op_index=OP_INDEX)
+
+    assert [item['name'] for item in merged['item'][0]['item']] == ["Create a new refund", "Get refund - unknown id"]
+    assert report.removed_from_spec == 1
+
+
+def test_streamed_merge_matches_the_in_memory_merge():
+    base = generated()
+    base['item'][0]['item'].append({"name": "admin", "item": [request("Get refund (admin)", "GET", "admin/refunds")]})
+    theirs = live_with_ids(base)
+    theirs['item'][0]['item'].append(request("Create refund - over limit", "POST", "refunds"))
+    theirs['item'].append({"name": "Smoke", "item": [request("Health", "GET", "health")]})
+    ours = generated()
+    ours['item'][0]['item'].append({"name": "admin", "item": [request("Get refund (admin)", "GET", "admin/refunds")]})
+    ours['item'][0]['item'][1]['event'] = [script_event("returns the refund")]
+
+    expected, expected_report = merge_collections(base, theirs, ours, op_index=OP_INDEX)
+
+    # Sorted keys put each folder's "name" after its "item" list
+    live_body = canonical_bytes({"collection": theirs})
+    chunks = (live_body[i:i + 7] for i in range(0, len(live_body), 7))
+    out = io.BytesIO()
+    report = merge_files(io.BytesIO(canonical_bytes(base)), chunks, io.BytesIO(canonical_bytes(ours)), out,
+                         op_index=OP_INDEX)
+
+    assert json.loads(out.getvalue()) == {"collection": expected}
+    assert report.summary() == expected_report.summary()
+    assert report.kept_manual_items == 2 and report.kept_manual_folders == 1
+
+
+def with_health(collection):
+    collection['item'].append({"name": "health", "item": [request("Health", "GET", "health")]})
+    return collection
+
+
+def test_folder_renamed_live_keeps_its_name_and_scripts():
+    base = with_health(generated())
+    theirs = live_with_ids(base)
+    theirs['item'][1]['name'] = "Health checks"
+    theirs['item'][1]['event'] = [script_event("is up")]
+
+    merged, report = merge_collections(base, theirs, with_health(generated()), op_index=OP_INDEX)
+
+    assert [folder['name'] for folder in merged['item']] == ["refunds", "Health checks"]
+    assert merged['item'][1]['event'] == [script_event("is up")]
+    assert [item['name'] for item in merged['item'][1]['item']] == ["Health"]
+    assert report.kept_manual_folders == 0
+
+
+def test_folder_deleted_live_stays_deleted_unless_the_spec_changed_it():
+    base = with_health(generated())
+    theirs = live_with_ids(base)
+    del theirs['item'][1]
+
+    merged, _ = merge_collections(base, theirs, with_health(generated()), op_index=OP_INDEX)
+    assert [folder['name'] for folder in merged['item']] == ["refunds"]
+
+    ours = with_health(generated())
+    ours['item'][1]['item'][0]['request']['body']['raw'] = '{"deep": true}'
+    merged, report = merge_collections(base, theirs, ours, op_index=OP_INDEX)
+    assert [folder['name'] for folder in merged['item']] == ["refunds", "health"]
+    assert report.added_from_spec == 1
+
+
+def test_generated_folder_removed_from_the_spec_is_dropped_unless_it_holds_manual_requests():
+    base = with_health(generated())
+    theirs = live_with_ids(base)
+
+    merged, report = merge_collections(base, theirs, generated(), op_index=OP_INDEX)
+    assert [folder['name'] for folder in merged['item']] == ["refunds"]
+    assert report.removed_from_spec == 1 and report.kept_manual_folders == 0
+
+    theirs['item'][1]['item'].append(request("Health - verbose", "GET", "health?verbose=true"))
+    merged, report = merge_collections(base, theirs, generated(), op_index=OP_INDEX)
+    assert [item['name'] for item in merged['item'][1]['item']] == ["Health - verbose"]
+    assert report.kept_manual_folders == 1 and report.kept_manual_items == 1
@@ -0,0 +1,37 @@
+from contract_tests import ContractValidator, ROUTE_CACHE_SIZE, build_test_script
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "Refunds", "version": "1"},
+    "paths": {
+        "/refunds/{refundId}": {"get": {"operationId": "getRefund", "responses": {"200": {"description": "ok"}}}},
+        "/refunds/search": {"get": {"operationId": "searchRefunds", "responses": {
+            "200": {"description": "ok"},
+            "4XX": {"description": "client error", "content": {"application/json": {"schema": {
+                "type": "object", "required": ["error"], "properties": {"error": {"type": "string"}}}}}},
+        }}},
+    },
+}
+
+
+def test_literal_segments_win_over_templates_at_the_same_depth():
+    validator = ContractValidator(SPEC)
+    assert validator.match('GET', 'https://api.example.com/refunds/search')[2] == "searchRefunds"
+    assert validator.match('GET', 'https://api.example.com/refunds/rf_123')[2] == "getRefund"
+
+
+def test_route_cache_is_bounded():
+    validator = ContractValidator(SPEC)
+    for n in range(ROUTE_CACHE_SIZE + 100):
+        validator.match('GET', f'/refunds/rf_{n}')
+    assert validator._find_route.cache_info().currsize == ROUTE_CACHE_SIZE
+
+
+def test_status_ranges_are_documented_for_both_runners():
+    validator = ContractValidator(SPEC)
+    assert validator.validate('GET', '/refunds/search', 422, {"error": "bad query"}) == ("searchRefunds", [])
+    assert validator.validate('GET', '/refunds/search', 422, {})[1]
+    script = '\n'.join(build_test_script(SPEC, SPEC['paths']['/refunds/search']['get']))
+    assert 'const documented = [200, "4XX"];' in script
+    assert 'String(code)[0] + "XX"' in script
+    assert 'contractSchemas[String(pm.response.code)[0] + "XX"]' in script
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from inventory import Crawler, summarize_detail
+
+
+def collection(name, updated_at, postman_id):
+    return {
+        "info": {"_postman_id": postman_id, "name": name, "createdAt": updated_at, "updatedAt": updated_at,
+                 "lastUpdatedBy": "12345", "schema": "https://schema.getpostman.com/json/collection/v2.1.0/"},
+        "item": [{"id": postman_id + "-1", "name": "List refunds",
+                  "request": {"method": "GET", "url": "{{baseUrl}}/refunds"}}],
+    }
+
+
+def test_copies_of_a_collection_hash_the_same():
+    original = summarize_detail("collection", collection("Refunds", "2026-01-01T00:00:00Z", "a"))
+    copy = summarize_detail("collection", collection("Refunds (copy)", "2026-09-30T12:00:00Z", "b"))
+    assert original == copy
+    assert original[1] == 1
+
+    changed = collection("Refunds", "2026-01-01T00:00:00Z", "a")
+    changed['item'][0]['request']['method'] = "POST"
+    assert summarize_detail("collection", changed)[0] != original[0]
+
+
+class FakeCrawler(Crawler):
+    def __init__(self, pages):
+        super().__init__({})
+        self.pages = pages
+
+    def get(self, path, params=None):
+        self.api_calls += 1
+        if self.api_calls > 10:
+            raise AssertionError("pagination did not stop")
+        return self.pages(params)
+
+
+def test_paginate_stops_on_a_repeating_cursor():
+    crawler = FakeCrawler(lambda params: {"apis": [{"id": "a1"}, {"id": "a2"}], "meta": {"nextCursor": "same"}})
+    assert [api['id'] for api in crawler.paginate("/apis", "apis", {})] == ["a1", "a2"]
+    assert crawler.api_calls == 2
+
+
+def test_paginate_stops_on_a_cursor_page_without_new_ids():
+    def pages(params):
+        cursor = params.get('cursor', 'c0')
+        ids = {'c0': ["a1", "a2"], 'c1': ["a3"]}.get(cursor, ["a3"])
+        return {"apis": [{"id": i} for i in ids], "meta": {"nextCursor": f"c{int(cursor[1:]) + 1}"}}
+
+    crawler = FakeCrawler(pages)
+    assert [api['id'] for api in crawler.paginate("/apis", "apis", {})] == ["a1", "a2", "a3"]
+    assert crawler.api_calls == 3
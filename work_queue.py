@@ -0,0 +1,371 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+
+import requests
+
+import ingest_api
+from artifact_store import ArtifactStore
+from sharding import SHARD_STRATEGIES
+
+# =============================================================================
+# POSTMAN ADOPTION STARTER KIT - DISTRIBUTED WORK QUEUE
+# =============================================================================
+#
+# ROLE: Spread spec ingestion over any number of worker processes and hosts.
+#
+# WHY: When every spec repo triggers a resync at once, one sequential run
+#      falls behind, and a crash mid-spec loses the whole batch.
+#
+# HOW: A coordinator enqueues one job per spec into a SQLite file (no broker).
+#      Workers claim jobs with a time-limited lease and extend it with
+#      heartbeats while Blocks A-E run. If a worker dies, its lease expires
+#      and another worker retries the job, up to --max-attempts.
+#
+#   python work_queue.py enqueue specs/*.yaml         # coordinator
+#   python work_queue.py worker                       # on each node, N times
+#   python work_queue.py status
+#
+# MULTI-HOST: put the queue file and --artifacts on storage every node can
+# reach with working POSIX locks. SQLite on NFS is only as safe as its locks.
+#
+# GUARANTEES: at-least-once. Every step of a job is idempotent (content-hashed
+# artifacts, publish skipped when the hash is unchanged), so a retried job only
+# finishes what the failed attempt did not.
+# =============================================================================
+
+QUEUE_FILE = os.getenv('POSTMAN_QUEUE_FILE', '.postman_queue.db')
+DEFAULT_LEASE_SECONDS = 120       # a job is retried this long after its worker's last heartbeat
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_SECONDS = 2.0
+RETRY_DELAY_SECONDS = 10          # doubled per failed attempt
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec_file     TEXT NOT NULL,
+    options       TEXT NOT NULL DEFAULT '{}',
+    state         TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    available_at  REAL NOT NULL,
+    lease_token   TEXT,
+    lease_expires REAL,
+    worker        TEXT,
+    enqueued_at   REAL NOT NULL,
+    finished_at   REAL,
+    last_error    TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, available_at);
+"""
+
+
+class LeaseLost(Exception):
+    """The job's lease expired (or was taken over) before the worker finished."""
+
+
+class WorkQueue:
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit; writes that must be atomic use BEGIN IMMEDIATE explicitly.
+        # One connection per call keeps the object usable from the heartbeat thread.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    # --- coordinator ---------------------------------------------------------
+
+    def enqueue(self, spec_file, options=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Add a job, unless the same spec + options is already waiting. Returns (id, created)."""
+        options_json = json.dumps(options or {}, sort_keys=True)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id FROM jobs WHERE spec_file = ? AND options = ? AND state = 'queued'",
+                               (spec_file, options_json)).fetchone()
+            if row:
+                # A resync storm collapses into one pending job per spec
+                conn.execute("COMMIT")
+                return row['id'], False
+            cursor = conn.execute(
+                "INSERT INTO jobs (spec_file, options, max_attempts, available_at, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                (spec_file, options_json, max_attempts, now, now))
+            conn.execute("COMMIT")
+            return cursor.lastrowid, True
+
+    def requeue_failed(self):
+        with self._connect() as conn:
+            return conn.execute("UPDATE jobs SET state = 'queued', attempts = 0, available_at = ?, last_error = NULL "
+                                "WHERE state = 'failed'", (time.time(),)).rowcount
+
+    def counts(self):
+        with self._connect() as conn:
+            return {row['state']: row['n'] for row in
+                    conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+
+    def jobs(self, states=None):
+        query = "SELECT * FROM jobs"
+        params = ()
+        if states:
+            query += f" WHERE state IN ({','.join('?' * len(states))})"
+            params = tuple(states)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY id", params)]
+
+    # --- worker --------------------------------------------------------------
+
+    def claim(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Lease the oldest runnable job: queued, or running with an expired lease.
+        Returns the job dict (with its lease_token) or None.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Expired leases whose attempts are used up fail instead of looping forever
+            conn.execute("UPDATE jobs SET state = 'failed', finished_at = ?, "
+                         "last_error = COALESCE(last_error, 'lease expired (worker lost)') "
+                         "WHERE state = 'running' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+            row = conn.execute(
+                "SELECT * FROM jobs j WHERE "
+                "((j.state = 'queued' AND j.available_at <= ?) OR (j.state = 'running' AND j.lease_expires < ?)) "
+                # One live attempt per spec: two workers must not publish the same spec at once
+                "AND NOT EXISTS (SELECT 1 FROM jobs r WHERE r.spec_file = j.spec_file AND r.id != j.id "
+                "                AND r.state = 'running' AND r.lease_expires >= ?) "
+                "ORDER BY j.available_at, j.id LIMIT 1", (now, now, now)).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            token = uuid.uuid4().hex
+            conn.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_token = ?, "
+                         "lease_expires = ?, worker = ? WHERE id = ?",
+                         (token, now + lease_seconds, worker, row['id']))
+            conn.execute("COMMIT")
+        job = dict(row)
+        if job['state'] == 'running':
+            print(f"   ♻️  Job {job['id']}: lease of {job['worker']} expired, retrying")
+        job.update(state='running', attempts=job['attempts'] + 1, lease_token=token, worker=worker,
+                   options=json.loads(job['options']))
+        return job
+
+    def heartbeat(self, job, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend the lease. Raises LeaseLost if another worker has taken the job over."""
+        with self._connect() as conn:
+            updated = conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ? "
+                                   "AND state = 'running'",
+                                   (time.time() + lease_seconds, job['id'], job['lease_token'])).rowcount
+        if not updated:
+            raise LeaseLost(f"job {job['id']}")
+
+    def complete(self, job):
+        with self._connect() as conn:
+            updated = conn.execute("UPDATE jobs SET state = 'done', finished_at = ?, last_error = NULL, "
+                                   "lease_expires = NULL WHERE id = ? AND lease_token = ?",
+                                   (time.time(), job['id'], job['lease_token'])).rowcount
+        if not updated:
+            raise LeaseLost(f"job {job['id']}")
+
+    def fail(self, job, error):
+        """Schedule a retry with backoff, or mark failed once attempts are used up."""
+        now = time.time()
+        with self._connect() as conn:
+            if job['attempts'] < job['max_attempts']:
+                delay = RETRY_DELAY_SECONDS * (2 ** (job['attempts'] - 1))
+                updated = conn.execute("UPDATE jobs SET state = 'queued', available_at = ?, last_error = ?, "
+                                       "lease_expires = NULL WHERE id = ? AND lease_token = ?",
+                                       (now + delay, error, job['id'], job['lease_token'])).rowcount
+            else:
+                updated = conn.execute("UPDATE jobs SET state = 'failed', finished_at = ?, last_error = ?, "
+                                       "lease_expires = NULL WHERE id = ? AND lease_token = ?",
+                                       (now, error, job['id'], job['lease_token'])).rowcount
+        if not updated:
+            raise LeaseLost(f"job {job['id']}")
+        return job['attempts'] < job['max_attempts']
+
+
+class _Closing:
+    """sqlite3's own context manager commits but never closes; this closes too."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type and self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+class _Heartbeat(threading.Thread):
+    """Extends a job's lease every lease/3 seconds until stopped."""
+
+    def __init__(self, queue, job, lease_seconds):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                self.queue.heartbeat(self.job, self.lease_seconds)
+            except LeaseLost:
+                self.lost = True
+                print(f"   ⚠️  Job {self.job['id']}: lease lost; another worker may retry it")
+                return
+            except sqlite3.Error as e:
+                # Busy/locked queue file: try again on the next beat, the lease still has slack
+                print(f"   ⚠️  Job {self.job['id']}: heartbeat failed ({e})")
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def check(self):
+        """Raise LeaseLost if the job now belongs to another worker; otherwise renew the lease."""
+        if not self.lost:
+            try:
+                self.queue.heartbeat(self.job, self.lease_seconds)
+            except LeaseLost:
+                self.lost = True
+            except sqlite3.Error:
+                pass              # busy queue file: the background beat keeps trying
+        if self.lost:
+            raise LeaseLost(f"job {self.job['id']}")
+
+
+def run_job(job, store, headers, workspace_id, heartbeat=None):
+    """Blocks A-E for one job: build the spec's artifacts, then publish them."""
+    options = job['options']
+    manifest = ingest_api.build_spec(job['spec_file'], store.root, options.get('shard_by'))
+    if heartbeat is not None:
+        # A long build can outlive the lease: never publish a job another worker has taken over
+        heartbeat.check()
+    error = ingest_api.apply_and_record(manifest, store, headers, workspace_id)
+    if error:
+        raise ingest_api.IngestError(f"apply failed for {manifest['name']}: {error}")
+
+
+def work(queue, artifact_dir, lease_seconds=DEFAULT_LEASE_SECONDS, poll_seconds=DEFAULT_POLL_SECONDS,
+         exit_when_empty=False):
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    headers = ingest_api.load_headers()
+    workspace_id = ingest_api.resolve_workspace_id(headers)
+    store = ArtifactStore(artifact_dir)
+    print(f"👷 Worker {worker} polling {queue.path} (lease {lease_seconds}s)")
+
+    processed = failed = 0
+    while True:
+        job = queue.claim(worker, lease_seconds)
+        if not job:
+            counts = queue.counts()
+            if exit_when_empty and not counts.get('queued') and not counts.get('running'):
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        print(f"\n📥 Job {job['id']} (attempt {job['attempts']}/{job['max_attempts']}): {job['spec_file']}")
+        heartbeat = _Heartbeat(queue, job, lease_seconds)
+        heartbeat.start()
+        error = None
+        try:
+            run_job(job, store, headers, workspace_id, heartbeat)
+        except LeaseLost:
+            print(f"   ⚠️  Job {job['id']}: lease lost during the build; not publishing")
+            continue
+        except (ingest_api.IngestError, requests.RequestException, OSError) as e:
+            error = str(e) or e.__class__.__name__
+        except Exception as e:
+            # A malformed spec or a bug must not leave the job stuck in 'running'
+            error = f"{e.__class__.__name__}: {e}"
+        finally:
+            heartbeat.stop()
+
+        try:
+            if error is None:
+                queue.complete(job)
+                processed += 1
+                print(f"   ✅ Job {job['id']} done")
+            elif queue.fail(job, error):
+                print(f"   🔁 Job {job['id']} failed ({error}); will retry")
+            else:
+                failed += 1
+                print(f"   ❌ Job {job['id']} failed permanently: {error}")
+        except LeaseLost:
+            # Someone else owns the job now; their result wins
+            print(f"   ⚠️  Job {job['id']}: lease lost before the result was recorded")
+
+    print(f"\n👋 Worker {worker} finished: {processed} done, {failed} failed")
+    return 1 if failed else 0
+
+
+def print_status(queue, verbose=False):
+    counts = queue.counts()
+    print("📊 " + ", ".join(f"{state}: {counts.get(state, 0)}" for state in ('queued', 'running', 'done', 'failed')))
+    now = time.time()
+    for job in queue.jobs(None if verbose else ('queued', 'running', 'failed')):
+        detail = ""
+        if job['state'] == 'running':
+            remaining = job['lease_expires'] - now
+            detail = f"{job['worker']}, lease {'expired' if remaining < 0 else f'{remaining:.0f}s left'}"
+        elif job['last_error']:
+            detail = job['last_error'][:100]
+        print(f"   #{job['id']:<5} {job['state']:<8} {job['attempts']}/{job['max_attempts']}  "
+              f"{job['spec_file']}  {detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Postman Adoption Starter Kit - distributed ingestion queue")
+    parser.add_argument('--queue', default=QUEUE_FILE, help="SQLite queue file shared by all workers")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = sub.add_parser('enqueue', help="add one job per spec")
+    enqueue.add_argument('specs', nargs='*', help=f"spec files or glob patterns (default: {ingest_api.SPEC_FILE})")
+    enqueue.add_argument('--shard-by', choices=SHARD_STRATEGIES, default=None)
+    enqueue.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    worker = sub.add_parser('worker', help="claim and run jobs until stopped")
+    worker.add_argument('--artifacts', default=ingest_api.ARTIFACT_DIR, help="artifact directory (shared across hosts)")
+    worker.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help="lease length in seconds")
+    worker.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, help="idle poll interval in seconds")
+    worker.add_argument('--exit-when-empty', action='store_true', help="stop once no job is queued or running")
+
+    status = sub.add_parser('status', help="show queue counts and pending/failed jobs")
+    status.add_argument('--all', action='store_true', help="include finished jobs")
+
+    sub.add_parser('retry-failed', help="put permanently failed jobs back in the queue")
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.queue)
+    if args.command == 'enqueue':
+        spec_files = ingest_api.expand_spec_args(args.specs)
+        options = {"shard_by": args.shard_by} if args.shard_by else {}
+        for spec_file in spec_files:
+            job_id, created = queue.enqueue(os.path.abspath(spec_file), options, args.max_attempts)
+            print(f"   {'➕ Queued' if created else '⏭️  Already queued'}: #{job_id} {spec_file}")
+        return 0
+    if args.command == 'worker':
+        return work(queue, args.artifacts, args.lease, args.poll, args.exit_when_empty)
+    if args.command == 'retry-failed':
+        print(f"🔁 Re-queued {queue.requeue_failed()} failed job(s)")
+        return 0
+    print_status(queue, args.all)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())